@@ -2,33 +2,53 @@
 #
 #
 
-from . import sastask
-from . import parser
-from . import param
-from . import error
-from . import runtask
-from . import configutils
-from . import init_sas
 from .version import *
-from .odfcontrol import odfcontrol
 
 __version__ = f'pysas - (pysas-{VERSION}) [{SAS_RELEASE}-{SAS_AKA}]'
 
-## For initialization of pySAS from configuration file.
-from .configutils import sas_cfg
-from .init_sas import initializesas
-import os
-sas_dir     = sas_cfg.get("sas", "sas_dir")
-sas_ccfpath = sas_cfg.get("sas", "sas_ccfpath")
+# Submodules are imported on first attribute access (PEP 562) so that
+# 'import pysas' does not pay for modules the caller never uses.
+# Maps attribute name -> module path relative to pysas, or for names
+# defined inside a submodule, (module path, name in that module).
+_LAZY = {
+    'sastask'    : '.sastask',
+    'parser'     : '.parser',
+    'param'      : '.param',
+    'error'      : '.error',
+    'runtask'    : '.runtask',
+    'configutils': '.configutils',
+    'init_sas'   : '.init_sas',
+    'odfcontrol' : '.odfcontrol.odfcontrol',
+    'sas_cfg'      : ('.configutils', 'sas_cfg'),
+    'initializesas': ('.init_sas', 'initializesas'),
+}
 
-# Checks if defaults work.
+# 'from pysas import *' exports the version names and the two
+# initialization names, but none of the lazy submodules, so a star
+# import does not load them all.
+__all__ = [name for name in vars(version) if not name.startswith('_')]
+__all__ += ['sas_cfg', 'initializesas']
 
-if os.path.exists(sas_dir) and os.path.exists(sas_ccfpath):
-    initializesas(sas_dir, sas_ccfpath)
-elif sas_dir != '/does/not/exist' and sas_ccfpath != '/does/not/exist':
-    print('There is a problem with either SAS_DIR or SAS_CCFPATH in the config file.')
-    print('Please set manually to initialize SAS.')
-    print('sas_dir....: {}'.format(sas_dir))
-    print('sas_ccfpath: {}'.format(sas_ccfpath))
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        target = _LAZY[name]
+        if isinstance(target, tuple):
+            modpath, attr = target
+            value = getattr(importlib.import_module(modpath, __name__), attr)
+        else:
+            value = importlib.import_module(target, __name__)
+        globals()[name] = value
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-del sas_dir, sas_ccfpath
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+## SAS is initialized from the configuration file defaults the first time
+## a part of pySAS that needs the SAS environment is used (ODFobject,
+## Wrapper, MyTask). To set up the SAS environment without creating a
+## task, e.g. before running SAS executables through subprocess, call
+##
+##     from pysas.init_sas import ensure_sas_initialized
+##     ensure_sas_initialized()
@@ -28,8 +28,9 @@ For configuring defaults of SAS enviroment variables.
 """
 
 # Standard library imports
-import os
+import os, atexit
 from configparser import ConfigParser
+from dataclasses import dataclass
 
 # Third party imports
 
@@ -51,7 +52,9 @@ sas_cfg_defaults = {
 
 CURRENT_CONFIG_FILE = None
 
-if (os.path.expanduser("~") == '/home/idies') and \
+_home = os.path.expanduser("~")
+
+if (_home == '/home/idies') and \
     os.path.exists('/home/idies/workspace/Storage/'):
     # If on SciServer, get enviroment variables. Replace defaults.
     sas_cfg_defaults['on_sci_server'] = True
@@ -60,14 +63,12 @@ if (os.path.expanduser("~") == '/home/idies') and \
     sas_ccfpath = os.environ.get('SAS_CCFPATH')
     sas_cfg_defaults['sas_dir']     = sas_dir
     sas_cfg_defaults['sas_ccfpath'] = sas_ccfpath
-    sas_cfg = ConfigParser(sas_cfg_defaults)
+    sas_cfg = ConfigParser(sas_cfg_defaults, interpolation=None)
     sas_cfg.add_section("sas")
 else:
     # If not on SciServer.
     # Check if .config directory exists. If not, make it.
-    config_root = os.environ.get(
-        "XDG_CONFIG_HOME", os.path.join(os.environ.get('HOME'), ".config")
-    )
+    config_root = os.environ.get("XDG_CONFIG_HOME") or os.path.join(_home, ".config")
     CONFIG_DIR = os.path.join(config_root, "sas")
     if not os.path.exists(CONFIG_DIR):
         try:
@@ -78,7 +79,7 @@ else:
     # Check if sas.cfg file exists. If not, make it. Populate with defaults.
     CURRENT_CONFIG_FILE = os.path.join(CONFIG_DIR, "sas.cfg")
     if not os.path.exists(CURRENT_CONFIG_FILE):
-        cp = ConfigParser(sas_cfg_defaults)
+        cp = ConfigParser(sas_cfg_defaults, interpolation=None)
         cp.add_section("sas")
         try:
             with open(CURRENT_CONFIG_FILE, "w") as new_cfg:
@@ -86,17 +87,58 @@ else:
         except IOError:
             raise Exception( f'Unable to write to SAS config file: {CURRENT_CONFIG_FILE}')
 
-    sas_cfg = ConfigParser(sas_cfg_defaults)
+    sas_cfg = ConfigParser(sas_cfg_defaults, interpolation=None)
     sas_cfg.read([CURRENT_CONFIG_FILE, "sas.cfg"])
     if not sas_cfg.has_section("sas"): sas_cfg.add_section("sas")    
 
+@dataclass(frozen=True)
+class SasConfig:
+    """
+    Read-only snapshot of the [sas] section of the configuration file.
+    """
+    sas_dir: str
+    sas_ccfpath: str
+    data_dir: str
+    verbosity: str
+    suppress_warning: str
+    on_sci_server: str
+
+def _build_cfg():
+    section = sas_cfg["sas"]
+    return SasConfig(**{k: section.get(k) for k in SasConfig.__dataclass_fields__})
+
+# Rebuilt by set_sas_config_option, so always read it as configutils.CFG.
+CFG = _build_cfg()
+
+# Changes made by set_sas_config_option are written to the config file
+# once, at interpreter exit, rather than on every call.
+_dirty = False
+_registered = False
+
 ######### Functions #########
 
+def _flush_cfg():
+    """
+    Writes sas_cfg to the config file if it has unsaved changes. Writes to
+    a temporary file first and renames it, so the config file is never
+    left partially written.
+    """
+    global _dirty
+    if not _dirty:
+        return
+    tmp = CURRENT_CONFIG_FILE + '.tmp'
+    with open(tmp, "w") as new_cfg:
+        sas_cfg.write(new_cfg)
+    os.replace(tmp, CURRENT_CONFIG_FILE)
+    _dirty = False
+
 def set_sas_config_option(option, value):
     """
     Set default SAS configuration values.
 
-    This sets values as default for future sessions.
+    This sets values as default for future sessions. The value takes
+    effect in this session immediately and is saved to the config file
+    when Python exits.
 
     Parameters
     ----------
@@ -105,11 +147,15 @@ def set_sas_config_option(option, value):
     value : number or string
         The value to set the option to.
     """
+    global CFG, _dirty, _registered
     if os.path.exists(CURRENT_CONFIG_FILE):
         option = option.lower()
         sas_cfg.set("sas", option, value=str(value))
-        with open(CURRENT_CONFIG_FILE, "w") as new_cfg:
-            sas_cfg.write(new_cfg)
+        CFG = _build_cfg()
+        _dirty = True
+        if not _registered:
+            atexit.register(_flush_cfg)
+            _registered = True
     else:
         print('No SAS configuration file found! Cannot set default value for:')
         print('Option: {0} ; Value: {1}'.format(option,value))
@@ -123,6 +169,9 @@ def clear_sas_defaults():
             verbosity
             suppress_warning
     """
+    global _dirty
+    # Discard any pending changes so they are not written back at exit.
+    _dirty = False
     if os.path.exists(CURRENT_CONFIG_FILE):
         os.remove(CURRENT_CONFIG_FILE)
     else:
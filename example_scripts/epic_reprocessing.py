@@ -20,31 +20,26 @@ Created on Wed Apr 26 12:39:28 2023
     This script will download data for a single obsID, run cfibuild and 
     odfingest. Then it will run epproc and emproc without options.
 
-"""
-
-import pysas
-
-obsid = '0802710101'
-
-odf = pysas.odfcontrol.ODFobject(obsid)
-
-###################### Two ways of doing the same thing. ######################
-
-# Method 1: All in 1
-odf.basic_setup(repo='heasarc')
-
-# Method 2: Explicitly laid out
-# odf.odfcompile(repo='heasarc')
-# odf.runanalysis('epproc',[])
-# odf.runanalysis('emproc',[])
+    The event files are then read and binned in parallel, one worker
+    process per file, and displayed before and after a basic filtering.
 
-###############################################################################
+"""
 
 import numpy as np
 import matplotlib.pyplot as plt
 from astropy.io import fits
-from astropy.table import Table
 from matplotlib.colors import LogNorm
+from multiprocessing import Pool
+
+import pysas
+
+# fast-histogram bins events much faster than numpy, which matters for
+# event lists with millions of rows. Fall back to numpy if not installed.
+try:
+    from fast_histogram import histogram2d
+except ImportError:
+    def histogram2d(x, y, bins, range):
+        return np.histogram2d(x, y, bins=bins, range=range)[0]
 
 # For display purposes only, define a minimum filtering criteria for EPIC-pn
 
@@ -60,209 +55,151 @@ mos_pi_min    = 300.    # Low energy range eV
 mos_pi_max    = 20000.  # High energy range eV
 mos_flag      = 0       # FLAG
 
-plt.figure(figsize=(15,60))
-
-pl=1
-
-evts=len(odf.files['pnevt_list'])+len(odf.files['m1evt_list'])+len(odf.files['m2evt_list'])
-if len(odf.files['pnevt_list']) >0:
-    for x in odf.files['pnevt_list']:  
-        hdu_list = fits.open(x, memmap=True)
-        evt_data = Table(hdu_list[1].data)
-        
-        mask = ((evt_data['PATTERN'] <= pn_pattern) &
-                (evt_data['FLAG'] == pn_flag) &
-                (evt_data['PI'] >= pn_pi_min) &
-                (evt_data['PI'] <= pn_pi_max))
-        print("Events in event file" + " " + x + ": " + str(len(evt_data)) + "\n")
-        print("Events in filtered event file" + " " + x + ": " + str(np.sum(mask)) + "\n")
-
-# Create Events image        
-
-        xmax=np.amax(evt_data['X']) 
-        xmin=np.amin(evt_data['X']) 
-        xmid=(xmax-xmin)/2.+xmin
-        ymax=np.amax(evt_data['Y']) 
-        ymin=np.amin(evt_data['Y'])
-        xbin_size=80
-        ybin_size=80
-        NBINS = (int((xmax-xmin)/xbin_size),int((ymax-ymin)/ybin_size))
-   
-        plt.subplot(evts, 2, pl)
-
-        img_zero_mpl = plt.hist2d(evt_data['X'], evt_data['Y'], NBINS, cmap='GnBu', norm=LogNorm())
-
-        cbar = plt.colorbar(ticks=[10.,100.,1000.])
-        cbar.ax.set_yticklabels(['10','100','1000'])
-        
-        plt.title(x)
-        plt.xlabel('x')
-        plt.ylabel('y')
-   
-        pl=pl+1
-    
-# Create Filtered Events image
-
-        xmax=np.amax(evt_data['X'][mask]) 
-        xmin=np.amin(evt_data['X'][mask]) 
-        xmid=(xmax-xmin)/2.+xmin
-        ymax=np.amax(evt_data['Y'][mask]) 
-        ymin=np.amin(evt_data['Y'][mask])
-        xbin_size=80
-        ybin_size=80
-        NBINS = (int((xmax-xmin)/xbin_size),int((ymax-ymin)/ybin_size))
-   
-        plt.subplot(evts, 2, pl)
-
-        img_zero_mpl = plt.hist2d(evt_data['X'][mask], evt_data['Y'][mask], NBINS, cmap='GnBu', norm=LogNorm())
-
-        cbar = plt.colorbar(ticks=[10.,100.,1000.])
-        cbar.ax.set_yticklabels(['10','100','1000'])
-        
-        plt.title(x)
-        plt.xlabel('x')
-        plt.ylabel('y')
-
-        txt=("PATTERN <= " + str(pn_pattern) + 
-            " : " + str(pn_pi_min) + " <= E(eV) <= " + str(pn_pi_max) + 
-            " : " + " FLAG = " + str(pn_flag))
-        plt.text(xmid, ymin+0.1*(ymax-ymin), txt, ha='center')
-    
-        pl=pl+1
-
-        hdu_list.close()
-    
-if len(odf.files['m1evt_list']) >0:
-    for x in odf.files['m1evt_list']:
-        hdu_list = fits.open(x, memmap=True)
-        evt_data = Table(hdu_list[1].data)
-
-        mask = ((evt_data['PATTERN'] <= mos_pattern) &
-                (evt_data['FLAG'] == mos_flag) &
-                (evt_data['PI'] >= mos_pi_min) &
-                (evt_data['PI'] <= mos_pi_max))
-        print("Events in event file" + " " + x + ": " + str(len(evt_data)) + "\n")
-        print("Events in filtered event file" + " " + x + ": " + str(np.sum(mask)) + "\n")
-
-# Create Events image            
-
-        xmax=np.amax(evt_data['X']) 
-        xmin=np.amin(evt_data['X']) 
-        xmid=(xmax-xmin)/2.+xmin
-        ymax=np.amax(evt_data['Y']) 
-        ymin=np.amin(evt_data['Y'])
-        xbin_size=80
-        ybin_size=80
-        NBINS = (int((xmax-xmin)/xbin_size),int((ymax-ymin)/ybin_size))
-   
-        plt.subplot(evts, 2, pl)
-
-        img_zero_mpl = plt.hist2d(evt_data['X'], evt_data['Y'], NBINS, cmap='GnBu', norm=LogNorm())
-
-        cbar = plt.colorbar(ticks=[10.,100.,1000.])
-        cbar.ax.set_yticklabels(['10','100','1000'])
-        
-        plt.title(x)
-        plt.xlabel('x')
-        plt.ylabel('y')
- 
-        pl=pl+1
-    
-# Create Filtered Events image
-
-        xmax=np.amax(evt_data['X'][mask]) 
-        xmin=np.amin(evt_data['X'][mask]) 
-        xmid=(xmax-xmin)/2.+xmin
-        ymax=np.amax(evt_data['Y'][mask]) 
-        ymin=np.amin(evt_data['Y'][mask])
-        xbin_size=80
-        ybin_size=80
-        NBINS = (int((xmax-xmin)/xbin_size),int((ymax-ymin)/ybin_size))
-   
-        plt.subplot(evts, 2, pl)
-
-        img_zero_mpl = plt.hist2d(evt_data['X'][mask], evt_data['Y'][mask], NBINS, cmap='GnBu', norm=LogNorm())
-
-        cbar = plt.colorbar(ticks=[10.,100.,1000.])
-        cbar.ax.set_yticklabels(['10','100','1000'])
-        
-        plt.title(x)
-        plt.xlabel('x')
-        plt.ylabel('y')
-
-        txt=("PATTERN <= " + str(mos_pattern) + 
-            " : " + str(mos_pi_min) + " <= E(eV) <= " + str(mos_pi_max) +
-            " : " + " FLAG = " + str(mos_flag))
-        plt.text(xmid, ymin+0.1*(ymax-ymin), txt, ha='center')
- 
-        pl=pl+1
-    
-        hdu_list.close()
-    
-if len(odf.files['m2evt_list']) >0:
-    for x in odf.files['m2evt_list']:
-        hdu_list = fits.open(x, memmap=True)
-        evt_data = Table(hdu_list[1].data)
-
-        mask = ((evt_data['PATTERN'] <= mos_pattern) &
-                (evt_data['FLAG'] == mos_flag) &
-                (evt_data['PI'] >= mos_pi_min) &
-                (evt_data['PI'] <= mos_pi_max))
-        print("Events in event file" + " " + x + ": " + str(len(evt_data)) + "\n")
-        print("Events in filtered event file" + " " + x + ": " + str(np.sum(mask)) + "\n")
-        
-# Create Events image
-
-        xmax=np.amax(evt_data['X']) 
-        xmin=np.amin(evt_data['X']) 
-        xmid=(xmax-xmin)/2.+xmin
-        ymax=np.amax(evt_data['Y']) 
-        ymin=np.amin(evt_data['Y'])
-        xbin_size=80
-        ybin_size=80
-        NBINS = (int((xmax-xmin)/xbin_size),int((ymax-ymin)/ybin_size))
-   
-        plt.subplot(evts, 2, pl)
-
-        img_zero_mpl = plt.hist2d(evt_data['X'], evt_data['Y'], NBINS, cmap='GnBu', norm=LogNorm())
-
-        cbar = plt.colorbar(ticks=[10.,100.,1000.])
-        cbar.ax.set_yticklabels(['10','100','1000'])
-
-        plt.title(x)
-        plt.xlabel('x')
-        plt.ylabel('y')
-       
-        pl=pl+1
-    
-# Create Filtered Events image    
-       
-        xmax=np.amax(evt_data['X'][mask]) 
-        xmin=np.amin(evt_data['X'][mask]) 
+# Display settings shared by all images. Each image still gets its own
+# LogNorm, as a norm scales itself to the first image it is used with.
+CMAP       = plt.get_cmap('GnBu')
+TICKS      = [10.,100.,1000.]
+TICKLABELS = ['10','100','1000']
+
+# Arguments to process_evt after the file name, for each camera.
+pn_params  = (pn_pattern, pn_flag, pn_pi_min, pn_pi_max)
+mos_params = (mos_pattern, mos_flag, mos_pi_min, mos_pi_max)
+
+def xy_bounds(X, Y):
+    # Returns (xmin, xmax, ymin, ymax) of the event coordinates. Each is a
+    # plain reduction over the contiguous column, with no temporary copy.
+    return X.min(), X.max(), Y.min(), Y.max()
+
+def bin_image(X, Y, xmin, xmax, ymin, ymax, bin_size):
+    # Bins the events into bin_size pixels over [xmin,xmax] x [ymin,ymax].
+    # fast_histogram drops values equal to the upper edge, unlike numpy, so
+    # the upper edges are moved just past xmax and ymax. Both then bin the
+    # same events.
+    NBINS = (int((xmax-xmin)/bin_size),int((ymax-ymin)/bin_size))
+    return histogram2d(X, Y, bins=NBINS,
+                       range=[[xmin,np.nextafter(xmax,np.inf)],
+                              [ymin,np.nextafter(ymax,np.inf)]])
+
+def event_mask(evt_data, pattern, flag, pi_min, pi_max):
+    # Builds the event selection mask in place. Each comparison is written
+    # into one reused scratch array, so only two boolean arrays are
+    # allocated. Returns the mask and the number of selected events.
+    PI = evt_data['PI']
+    mask = evt_data['PATTERN'] <= pattern
+    tmp = np.empty_like(mask)
+    mask &= np.equal(evt_data['FLAG'], flag, out=tmp)
+    mask &= np.greater_equal(PI, pi_min, out=tmp)
+    mask &= np.less_equal(PI, pi_max, out=tmp)
+    return mask, np.count_nonzero(mask)
+
+def process_evt(x, pattern, flag, pi_min, pi_max, bin_size=80):
+    """
+    Reads the event file x and bins the events, before and after filtering.
+    Runs in a worker process, so no plotting is done here.
+
+    Returns (x, number of events, number of filtered events, images, txt)
+    where images is a list of (histogram, extent), one for the events and
+    one for the filtered events.
+    """
+    # Read the file sequentially (no memmap) and copy out only the columns
+    # that are needed, each as a contiguous array in native byte order
+    # (FITS data are big-endian).
+    with fits.open(x, memmap=False) as hdu_list:
+        rec = hdu_list[1].data
+        evt_data = {name: rec[name].astype(rec[name].dtype.newbyteorder('='))
+                    for name in ('X', 'Y', 'PI', 'FLAG')}
+        # PATTERN is a small number, so a uint8 copy is enough. FLAG is a
+        # 32 bit mask and is kept at full width.
+        evt_data['PATTERN'] = rec['PATTERN'].astype(np.uint8)
+        nevents = len(rec)
+
+    images = []
+
+    mask, count = event_mask(evt_data, pattern, flag, pi_min, pi_max)
+
+    # Create Events image
+
+    X = evt_data['X']
+    Y = evt_data['Y']
+    xmin, xmax, ymin, ymax = xy_bounds(X, Y)
+    H = bin_image(X, Y, xmin, xmax, ymin, ymax, bin_size)
+    images.append((H, [xmin,xmax,ymin,ymax]))
+
+    # Create Filtered Events image
+
+    if count == 0:
+        # No events pass the filter, so there are no bounds to bin over.
+        # Return a single empty bin over the unfiltered extent.
+        images.append((np.zeros((1,1)), [xmin,xmax,ymin,ymax]))
+    else:
+        # Apply the mask once and reuse the filtered coordinates.
+        Xf = X[mask]
+        Yf = Y[mask]
+        xmin, xmax, ymin, ymax = xy_bounds(Xf, Yf)
+        H = bin_image(Xf, Yf, xmin, xmax, ymin, ymax, bin_size)
+        images.append((H, [xmin,xmax,ymin,ymax]))
+
+    txt=("PATTERN <= " + str(pattern) + 
+        " : " + str(pi_min) + " <= E(eV) <= " + str(pi_max) + 
+        " : " + " FLAG = " + str(flag))
+
+    return x, nevents, count, images, txt
+
+if __name__ == '__main__':
+
+    obsid = '0802710101'
+
+    odf = pysas.odfcontrol.ODFobject(obsid)
+
+    ###################### Two ways of doing the same thing. ######################
+
+    # Method 1: All in 1
+    odf.basic_setup(repo='heasarc')
+
+    # Method 2: Explicitly laid out
+    # odf.odfcompile(repo='heasarc')
+    # odf.runanalysis('epproc',[])
+    # odf.runanalysis('emproc',[])
+
+    ###############################################################################
+
+    cameras = [(odf.files['pnevt_list'], pn_params),
+               (odf.files['m1evt_list'], mos_params),
+               (odf.files['m2evt_list'], mos_params)]
+    jobs = [(x,) + params for evt_list, params in cameras for x in evt_list]
+
+    # Each event file is processed in its own worker. matplotlib is only
+    # used from the main process.
+    with Pool() as pool:
+        results = pool.starmap(process_evt, jobs)
+
+    # Event counts for all files, written with a single print.
+    print(''.join(f"Events in event file {x}: {nevents}\n\n"
+                  f"Events in filtered event file {x}: {count}\n\n"
+                  for x, nevents, count, images, txt in results), end='')
+
+    # One row of axes per event file: events on the left, filtered events
+    # on the right.
+    evts=len(results)
+    if evts > 0:
+        fig, axes = plt.subplots(evts, 2, figsize=(15,60), squeeze=False)
+
+    for row, (x, nevents, count, images, txt) in enumerate(results):
+        for ax, (H, extent) in zip(axes[row], images):
+            # Fixing vmin at one count keeps LogNorm valid for images with
+            # empty bins, including the empty image process_evt returns
+            # when no events pass the filter.
+            im = ax.imshow(H.T, origin='lower', extent=extent, aspect='auto',
+                           interpolation='nearest', cmap=CMAP,
+                           norm=LogNorm(vmin=1, vmax=max(H.max(),1)))
+
+            cbar = fig.colorbar(im, ax=ax, ticks=TICKS)
+            cbar.ax.set_yticklabels(TICKLABELS)
+
+            ax.set_title(x)
+            ax.set_xlabel('x')
+            ax.set_ylabel('y')
+
+        xmin, xmax, ymin, ymax = extent
         xmid=(xmax-xmin)/2.+xmin
-        ymax=np.amax(evt_data['Y'][mask]) 
-        ymin=np.amin(evt_data['Y'][mask])
-        xbin_size=80
-        ybin_size=80
-        NBINS = (int((xmax-xmin)/xbin_size),int((ymax-ymin)/ybin_size))
-   
-        plt.subplot(evts, 2, pl)
-
-        img_zero_mpl = plt.hist2d(evt_data['X'][mask], evt_data['Y'][mask], NBINS, cmap='GnBu', norm=LogNorm())
-
-        cbar = plt.colorbar(ticks=[10.,100.,1000.])
-        cbar.ax.set_yticklabels(['10','100','1000'])
-
-        plt.title(x)
-        plt.xlabel('x')
-        plt.ylabel('y')
-        
-        txt=("PATTERN <= " + str(mos_pattern) + 
-            " : " + str(mos_pi_min) + " <= E(eV) <= " + str(mos_pi_max) + 
-            " : " + " FLAG = " + str(mos_flag))
-        plt.text(xmid, ymin+0.1*(ymax-ymin), txt, ha='center')
-
-        pl=pl+1
-
-        hdu_list.close()
-        
+        ax.text(xmid, ymin+0.1*(ymax-ymin), txt, ha='center')
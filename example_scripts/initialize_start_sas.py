@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-import os
+import os, sys
 
 #########################################################
 ######## User needs to set these paths. #################
@@ -16,20 +16,14 @@ data_dir = '/home/rtanner2/xmm_data'
 # Observation ID, will download obsid data files.
 obsid = '0802710101'
 
-# Checks if PYTHONPATH has path to pysas in SAS installation directory.
-# If you already have sas_dir/lib/python as part of PYTHONPATH
+# Checks if the import path has the path to pysas in SAS installation
+# directory. If you already have sas_dir/lib/python as part of PYTHONPATH
 # then you don't need this.
 # This is so pySAS can be imported before SAS is initialized.
-pythonpath = os.environ.get('PYTHONPATH')
-if pythonpath is not None:
-    pythonpath = pythonpath.split(os.pathsep)
-else:
-    pythonpath = []
-    
+# (Changing os.environ['PYTHONPATH'] here would not affect this session.)
 pysas_dir = os.path.join(sas_dir,'lib','python')
-if not pysas_dir in pythonpath:
-    pythonpath.append(pysas_dir)
-    os.environ['PYTHONPATH'] = os.pathsep.join(pythonpath)
+if not pysas_dir in sys.path:
+    sys.path.insert(0, pysas_dir)
     
 #########################################################
 
@@ -28,15 +28,24 @@ For auto initializing SAS on import of pySAS.
 """
 
 # Standard library imports
-import os, subprocess
+import os, shutil
 
 # Third party imports
 
 # Local application imports
 
+# Set once SAS has been initialized in this session, either explicitly
+# through initializesas or from the configuration file defaults.
+_sas_initialized = False
+
+# Arguments and result of the last successful call to initializesas, so
+# repeated calls with the same arguments do not redo the work.
+_sas_init_key = None
+_sas_init_info = None
+
 # Function to initialize SAS
 
-def add_environ_variable(variable,invalue,prepend=True):
+def add_environ_variable(variable,invalue,prepend=True,append=None):
         """
         variable (str) is the name of the environment variable to be set.
         
@@ -45,6 +54,9 @@ def add_environ_variable(variable,invalue,prepend=True):
         
         prepend (boolean) default=True, whether to prepend or append the 
         variable
+
+        append (list) default=None, values to append after value has been
+        prepended. Both are merged into the variable with a single write.
         
         The function first checks if the enviroment variable already exists.
         If not it will be created and set to value.
@@ -56,29 +68,54 @@ def add_environ_variable(variable,invalue,prepend=True):
         None.
 
         """
+
+        # Looked up once and used as locals below.
+        environ = os.environ
+        pathsep = os.pathsep
         
-        if isinstance(invalue, str):
+        if isinstance(invalue, str) and not append:
+            # Single value, the common case. No list needed.
+            environ_var = environ.get(variable)
+            if not environ_var:
+                environ[variable] = invalue
+                return
+            splitpath = environ_var.split(pathsep)
+            if invalue in splitpath:
+                return
+            if prepend:
+                splitpath.insert(0,invalue)
+            else:
+                splitpath.append(invalue)
+            environ[variable] = pathsep.join(splitpath)
+            return
+        elif isinstance(invalue, str):
             listvalue = [invalue]
-        else:
+        elif isinstance(invalue, list):
             listvalue = invalue
-            
-        if not isinstance(listvalue, list):
+        else:
             raise Exception('Input to add_environ_variable must be str or list!')
+        if prepend:
+            front, back = listvalue, append or []
+        else:
+            front, back = [], listvalue + (append or [])
         
-        for value in listvalue:
-            environ_var = os.environ.get(variable)
-            # Create variable if it does not exist.
-            if not environ_var:
-                os.environ[variable] = value
-            else:
-                splitpath = environ_var.split(os.pathsep)
+        # Read and split the variable once. An empty or missing variable
+        # starts as an empty list.
+        environ_var = environ.get(variable)
+        splitpath = environ_var.split(pathsep) if environ_var else []
+        seen = set(splitpath)
+        newfront = []
+        newback = []
+        for values, newvalues in ((front, newfront), (back, newback)):
+            for value in values:
                 # Only add if the new value does not exist in the variable.
-                if not value in splitpath:
-                    if prepend:
-                        splitpath.insert(0,value)
-                    else:
-                        splitpath.append(value)
-                    os.environ[variable] = os.pathsep.join(splitpath)
+                if value not in seen:
+                    seen.add(value)
+                    newvalues.append(value)
+        # Join and write once, and only if something was added. New values
+        # keep their order whether prepended or appended.
+        if newfront or newback:
+            environ[variable] = pathsep.join(newfront + splitpath + newback)
 
 def overwrite_environ_variable(variable,invalue):
     """
@@ -122,6 +159,11 @@ def initializesas(sas_dir, sas_ccfpath, verbosity = 4, suppress_warning = 1, ima
     --------
     Information about SAS envirment veriables that were set.
     """
+    global _sas_initialized, _sas_init_key, _sas_init_info
+
+    key = (sas_dir, sas_ccfpath, verbosity, suppress_warning, image_viewer)
+    if key == _sas_init_key and os.environ.get('SAS_DIR') == sas_dir:
+        return _sas_init_info
 
     ######
     # Checking LHEASOFT and inputs
@@ -134,10 +176,9 @@ def initializesas(sas_dir, sas_ccfpath, verbosity = 4, suppress_warning = 1, ima
     add_environ_variable('HEADASNOQUERY','')
     add_environ_variable('HEADASPROMPT','/dev/null')
 
-    # Checks if a basic call to HEASOFT works.
-    try:
-        heasoft_test = subprocess.run(["fversion"],stdout = subprocess.DEVNULL)
-    except FileNotFoundError:
+    # Checks that HEASOFT tools can be found on the PATH. Looking up
+    # 'fversion' avoids spawning a process on every initialization.
+    if shutil.which('fversion') is None:
         raise Exception('HEASOFT is not initialized. Please initialise HEASOFT')
 
     # Will not check the configuration file. Configuration file checking must happen 
@@ -150,31 +191,35 @@ def initializesas(sas_dir, sas_ccfpath, verbosity = 4, suppress_warning = 1, ima
     # Hard overwrite. To set or reset values.
     overwrite_environ_variable('SAS_DIR',sas_dir)
     overwrite_environ_variable('SAS_CCFPATH',sas_ccfpath)
-    overwrite_environ_variable('SAS_PATH',[sas_dir])
-    
-    binpath = [os.path.join(sas_dir,'bin'), os.path.join(sas_dir,'bin','devel')]
-    libpath = [os.path.join(sas_dir,'lib'),os.path.join(sas_dir,'libextra'),os.path.join(sas_dir,'libsys')]
-    perlpath = [os.path.join(sas_dir,'lib','perl5')]
-    pythonpath = [os.path.join(sas_dir,'lib','python')]
+
+    # The suffixes are constant, so plain string concatenation is enough.
+    sep = os.sep
+    sd = sas_dir.rstrip(sep)
+    binpath = [f'{sd}{sep}bin', f'{sd}{sep}bin{sep}devel']
+    libpath = [f'{sd}{sep}lib', f'{sd}{sep}libextra', f'{sd}{sep}libsys']
+    perlpath = [f'{sd}{sep}lib{sep}perl5']
+    pythonpath = [f'{sd}{sep}lib{sep}python']
+
+    # SAS_PATH is reset to sas_dir followed by all SAS paths, with one write.
+    overwrite_environ_variable('SAS_PATH',
+        list(dict.fromkeys([sas_dir]+binpath+libpath+perlpath+pythonpath)))
+
+    perllib = os.environ.get('PERLLIB')
 
     # Soft add. Will only add if value does not exist in enviroment variable.
-    add_environ_variable('SAS_PATH',binpath+libpath+perlpath+pythonpath,prepend=False)
+    # Every variable is read, merged and written back at most once.
     add_environ_variable('PATH',binpath)
     add_environ_variable('LIBRARY_PATH',libpath,prepend=False)
     add_environ_variable('LD_LIBRARY_PATH',libpath,prepend=False)
-    add_environ_variable('PERL5LIB',perlpath)
+    add_environ_variable('PERL5LIB',perlpath,
+        append=list(filter(None, perllib.split(os.pathsep))) if perllib else None)
     add_environ_variable('PYTHONPATH',pythonpath)
 
-    perllib = os.environ.get('PERLLIB')
-    if perllib:
-        splitpath = perllib.split(os.pathsep)
-        add_environ_variable('PERL5LIB',splitpath,prepend=False)
-
-    os.environ['SAS_VERBOSITY'] = '{}'.format(verbosity)
-    os.environ['SAS_SUPPRESS_WARNING'] = '{}'.format(suppress_warning)
-    os.environ['SAS_IMAGEVIEWER'] = '{}'.format(image_viewer)
+    os.environ['SAS_VERBOSITY'] = f'{verbosity}'
+    os.environ['SAS_SUPPRESS_WARNING'] = f'{suppress_warning}'
+    os.environ['SAS_IMAGEVIEWER'] = f'{image_viewer}'
 
-    sas_path = os.environ.get('SAS_PATH')
+    sas_path = os.environ['SAS_PATH']
 
     return_info = f"""
         SAS_DIR set to {sas_dir}
@@ -194,4 +239,40 @@ def initializesas(sas_dir, sas_ccfpath, verbosity = 4, suppress_warning = 1, ima
     SAS_SUPPRESS_WARNING set to {suppress_warning}
     """
 
-    return return_info
\ No newline at end of file
+    _sas_initialized = True
+    _sas_init_key = key
+    _sas_init_info = return_info
+
+    return return_info
+
+def ensure_sas_initialized():
+    """
+    Initializes SAS using sas_dir and sas_ccfpath from the configuration
+    file. Only does anything the first time it is called, and not at all
+    if SAS has already been initialized in this session.
+
+    Called by the parts of pySAS that need the SAS environment variables,
+    so that 'import pysas' on its own does not modify the environment.
+
+    Returns
+    -------
+    None.
+    """
+    global _sas_initialized
+    if _sas_initialized:
+        return
+
+    from . import configutils
+    sas_dir     = configutils.CFG.sas_dir
+    sas_ccfpath = configutils.CFG.sas_ccfpath
+
+    # Checks if defaults work.
+    if os.path.exists(sas_dir) and os.path.exists(sas_ccfpath):
+        initializesas(sas_dir, sas_ccfpath)
+    elif sas_dir != '/does/not/exist' and sas_ccfpath != '/does/not/exist':
+        print('There is a problem with either SAS_DIR or SAS_CCFPATH in the config file.')
+        print('Please set manually to initialize SAS.')
+        print('sas_dir....: {}'.format(sas_dir))
+        print('sas_ccfpath: {}'.format(sas_ccfpath))
+
+    _sas_initialized = True
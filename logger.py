@@ -100,8 +100,9 @@ class TaskLogger:
             sastasklogfmode = 'a'
         #print(f'\nTask logging file mode = {sastasklogfmode}')
 
-        # File handler (fh). Level fixed to DEBUG
-        self.fh = logging.FileHandler(self.logfile, mode=sastasklogfmode)
+        # File handler (fh). Level fixed to DEBUG. The log file is only
+        # opened when the first message is written.
+        self.fh = logging.FileHandler(self.logfile, mode=sastasklogfmode, delay=True)
         self.fh.setLevel('DEBUG')
 
         # Console handler (ch). Default level set to WARNING
@@ -1 +1,2 @@
-from . import odfcontrol
\ No newline at end of file
+from . import odfcontrol
+from .odfcontrol import *
@@ -26,15 +26,26 @@ odfcontrol.py
 """
 
 # Standard library imports
-import os, sys, subprocess, shutil, glob, tarfile, gzip
+import os, sys, re, subprocess, shutil, glob, tarfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Third party imports
+# rapidgzip (optional) decompresses gzip files in parallel.
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+# isal (optional) provides a faster drop-in replacement for gzip.
+try:
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
 
 # Local application imports
 # from .version import VERSION, SAS_RELEASE, SAS_AKA
 from ..logger import TaskLogger as TL
-from ..configutils import sas_cfg
-from ..init_sas import initializesas
+from .. import configutils
+from ..init_sas import initializesas, ensure_sas_initialized
 from ..wrapper import Wrapper as w
 
 # __version__ = f'odfcontrol (startsas-{VERSION}) [{SAS_RELEASE}-{SAS_AKA}]' 
@@ -62,6 +73,7 @@ class ODFobject(object):
     """
 
     def __init__(self,odfid,data_dir=None):
+        ensure_sas_initialized()
         self.odfid = odfid
         self.data_dir = data_dir
         self.files = {}
@@ -89,16 +101,14 @@ class ODFobject(object):
         anything other than link to files and directories. 
         """
 
-        # Where are we?
-        startdir = os.getcwd()
-
-        # Brief check to see if data_dir was 
-        # given on odfobject creation.
+        # Use data_dir if it was given on odfobject creation,
+        # otherwise the default from the configuration file.
         if self.data_dir != None:
             data_dir = self.data_dir
+        else:
+            data_dir = configutils.CFG.data_dir
 
         # Start checking data_dir
-        data_dir = sas_cfg.get("sas", "data_dir")
         if os.path.exists(data_dir):
             self.data_dir = data_dir
         else:
@@ -108,6 +118,7 @@ class ODFobject(object):
         # Set directories for the observation, odf, pps, and work.
         self.obs_dir  = os.path.join(self.data_dir,self.odfid)
         self.odf_dir  = os.path.join(self.obs_dir,'ODF')
+        self.pps_dir  = os.path.join(self.obs_dir,'PPS')
         self.work_dir = os.path.join(self.obs_dir,'work')
 
         if os.path.exists(self.obs_dir):
@@ -129,16 +140,19 @@ class ODFobject(object):
         logger = generate_logger(logname='odf_'+self.odfid, log_dir=self.data_dir)
         logger.log('info', f'Data directory = {self.data_dir}')
         logger.log('info', f'Existing directory for {self.odfid} found ...')
-        logger.log('info', f'Searching {self.data_dir}/{self.odfid} for ccf.cif and *SUM.SAS files ...')
+        logger.log('info', f'Searching {self.obs_dir} for ccf.cif and *SUM.SAS files ...')
+
+        # Looking for ccf.cif and *SUM.SAS files, in a single walk.
+        found_ccf, found_odf = find_files(self.obs_dir,
+                                          lambda name: 'ccf.cif' in name,
+                                          lambda name: 'SUM.SAS' in name)
 
         # Looking for ccf.cif file.
         self.files['sas_ccf'] = os.path.join('does','not','exist')
         logger.log('info', f'Searching for ccf.cif.')
-        for path, directories, files in os.walk(self.obs_dir):
-            for file in files:
-                if 'ccf.cif' in file:
-                    logger.log('info', f'Found ccf.cif file in {path}.')
-                    self.files['sas_ccf'] = os.path.join(path,file)
+        if found_ccf:
+            logger.log('info', f'Found ccf.cif file in {os.path.dirname(found_ccf)}.')
+            self.files['sas_ccf'] = found_ccf
         # Check if ccf.cif file exists.
         if os.path.exists(self.files['sas_ccf']):
             logger.log('info', '{0} is present'.format(self.files['sas_ccf']))
@@ -155,11 +169,9 @@ class ODFobject(object):
         # Looking for *SUM.SAS file.
         self.files['sas_odf'] = os.path.join('does','not','exist')
         logger.log('info', f'Path to *SUM.SAS file not given. Will search for it.')
-        for path, directories, files in os.walk(self.obs_dir):
-            for file in files:
-                if 'SUM.SAS' in file:
-                    logger.log('info', f'Found *SUM.SAS file in {path}.')
-                    self.files['sas_odf'] = os.path.join(path,file)
+        if found_odf:
+            logger.log('info', f'Found *SUM.SAS file in {os.path.dirname(found_odf)}.')
+            self.files['sas_odf'] = found_odf
         # Check if *SUM.SAS file exists.
         if os.path.exists(self.files['sas_odf']):
             logger.log('info', '{0} is present'.format(self.files['sas_odf']))
@@ -169,18 +181,15 @@ class ODFobject(object):
             return
         
         # Check that the SUM.SAS file PATH keyword points to a real ODF directory
-        with open(self.files['sas_odf']) as inf:
-            lines = inf.readlines()
-            for line in lines:
-                if 'PATH' in line:
-                    key, path = line.split()
-                    if not os.path.exists(path):
-                        logger.log('error', f'Summary file PATH {path} does not exist. Rerun odfcompile with overwrite=True.')
-                        print(f'\nSummary file PATH {path} does not exist. \n\n>>>>Rerun odfcompile with overwrite=True.')
-                    MANIFEST = glob.glob(os.path.join(path, 'MANIFEST*'))
-                    if not os.path.exists(MANIFEST[0]):
-                        logger.log('error', f'Missing {MANIFEST[0]} file in {path}. Missing ODF components? Rerun odfcompile with overwrite=True.')
-                        print(f'\nMissing {MANIFEST[0]} file in {path}. Missing ODF components? \n\n>>>>Rerun odfcompile with overwrite=True.')
+        path = sum_sas_path(self.files['sas_odf'])
+        if path is not None:
+            if not os.path.exists(path):
+                logger.log('error', f'Summary file PATH {path} does not exist. Rerun odfcompile with overwrite=True.')
+                print(f'\nSummary file PATH {path} does not exist. \n\n>>>>Rerun odfcompile with overwrite=True.')
+            MANIFEST = glob.glob(os.path.join(path, 'MANIFEST*'))
+            if not MANIFEST:
+                logger.log('error', f'Missing MANIFEST file in {path}. Missing ODF components? Rerun odfcompile with overwrite=True.')
+                print(f'\nMissing MANIFEST file in {path}. Missing ODF components? \n\n>>>>Rerun odfcompile with overwrite=True.')
         
         # Set 'SAS_ODF' enviroment variable.
         os.environ['SAS_ODF'] = self.files['sas_odf']
@@ -212,9 +221,10 @@ class ODFobject(object):
                          'OM': 'OM'}
         for item in inst_list: self.files[evt_list_list[item]] = []
 
+        # Walk obs_dir once for all instruments.
+        files = glob.glob(self.obs_dir+'/**/*Evts.ds', recursive=True)
         for inst in inst_list:
             exists = False
-            files = glob.glob(self.obs_dir+'/**/*.ds', recursive=True)
             for filename in files:
                 if (filename.find(find_list[inst]) != -1) and filename.endswith('Evts.ds'):
                     self.files[evt_list_list[inst]].append(os.path.abspath(filename))
@@ -310,7 +320,7 @@ class ODFobject(object):
 
         # Start checking data_dir
         if data_dir == None:
-            data_dir = sas_cfg.get("sas", "data_dir")
+            data_dir = configutils.CFG.data_dir
             if os.path.exists(data_dir):
                 self.data_dir = data_dir
             else:
@@ -320,10 +330,8 @@ class ODFobject(object):
 
         # If data_dir was not given as an absolute path, it is interpreted
         # as a subdirectory of startdir.
-        if self.data_dir[0] != '/':
-            self.data_dir = os.path.join(startdir, self.data_dir)
-        elif self.data_dir[:2] == './':
-            self.data_dir = os.path.join(startdir, self.data_dir[2:])
+        if not os.path.isabs(self.data_dir):
+            self.data_dir = os.path.normpath(os.path.join(startdir, self.data_dir))
 
         # Check if data_dir exists. If not then create it.
         # Save comments for the logger created later.
@@ -384,6 +392,7 @@ class ODFobject(object):
         # Set directories for the observation, odf, pps, and work.
         self.obs_dir  = os.path.join(self.data_dir,self.odfid)
         self.odf_dir  = os.path.join(self.obs_dir,'ODF')
+        self.pps_dir  = os.path.join(self.obs_dir,'PPS')
         self.work_dir = os.path.join(self.obs_dir,'work')
 
         # Checks if obs_dir exists. Removes it if overwrite = True.
@@ -391,22 +400,29 @@ class ODFobject(object):
         if os.path.exists(self.obs_dir):
             if not overwrite:
                 logger.log('info', f'Existing directory for {self.odfid} found ...')
-                logger.log('info', f'Searching {self.data_dir}/{self.odfid} for ccf.cif and *SUM.SAS files ...')
+                logger.log('info', f'Searching {self.obs_dir} for ccf.cif and *SUM.SAS files ...')
+
+                # Look for the ccf.cif and *SUM.SAS files that were not
+                # given, in a single walk.
+                want_ccf = self.files['sas_ccf'] == None
+                want_odf = self.files['sas_odf'] == None
+                found_ccf = found_odf = None
+                if want_ccf or want_odf:
+                    found_ccf, found_odf = find_files(self.obs_dir,
+                        (lambda name: 'ccf.cif' in name) if want_ccf else None,
+                        (lambda name: 'SUM.SAS' in name) if want_odf else None)
 
                 # Looking for ccf.cif file.
-                if self.files['sas_ccf'] == None:
+                if want_ccf:
                     logger.log('info', f'Path to ccf.cif file not given. Will search for it.')
-                    for path, directories, files in os.walk(self.obs_dir):
-                        for file in files:
-                            if 'ccf.cif' in file:
-                                logger.log('info', f'Found ccf.cif file in {path}.')
-                                self.files['sas_ccf'] = os.path.join(path,file)
+                    if found_ccf:
+                        logger.log('info', f'Found ccf.cif file in {os.path.dirname(found_ccf)}.')
+                        self.files['sas_ccf'] = found_ccf
                 else:
                     # Check if ccf.cif file exists.
-                    try:
-                        os.path.exists(self.files['sas_ccf'])
+                    if os.path.exists(self.files['sas_ccf']):
                         logger.log('info', '{0} is present'.format(self.files['sas_ccf']))
-                    except FileExistsError:
+                    else:
                         logger.log('error', 'File {0} not present! Please check if path is correct!'.format(self.files['sas_ccf']))
                         print('File {0} not present! Please check if path is correct!'.format(self.files['sas_ccf']))
                         sys.exit(1)
@@ -418,36 +434,30 @@ class ODFobject(object):
                 print('SAS_CCF = {}'.format(self.files['sas_ccf']))
 
                 # Looking for *SUM.SAS file.
-                if self.files['sas_odf'] == None:
+                if want_odf:
                     logger.log('info', f'Path to *SUM.SAS file not given. Will search for it.')
-                    for path, directories, files in os.walk(self.obs_dir):
-                        for file in files:
-                            if 'SUM.SAS' in file:
-                                logger.log('info', f'Found *SUM.SAS file in {path}.')
-                                self.files['sas_odf'] = os.path.join(path,file)
+                    if found_odf:
+                        logger.log('info', f'Found *SUM.SAS file in {os.path.dirname(found_odf)}.')
+                        self.files['sas_odf'] = found_odf
                 else:
                     # Check if *SUM.SAS file exists.
-                    try:
-                        os.path.exists(self.files['sas_odf'])
+                    if os.path.exists(self.files['sas_odf']):
                         logger.log('info', '{0} is present'.format(self.files['sas_odf']))
-                    except FileExistsError:
+                    else:
                         logger.log('error', 'File {0} not present! Please check if path is correct!'.format(self.files['sas_odf']))
                         print('File {0} not present! Please check if path is correct!'.format(self.files['sas_odf']))
                         sys.exit(1)
                         
                 # Check that the SUM.SAS file PATH keyword points to a real ODF directory
-                with open(self.files['sas_odf']) as inf:
-                    lines = inf.readlines()
-                    for line in lines:
-                        if 'PATH' in line:
-                            key, path = line.split()
-                            if not os.path.exists(path):
-                                logger.log('error', f'Summary file PATH {path} does not exist. Rerun odfcompile with overwrite=True.')
-                                raise Exception(f'Summary file PATH {path} does not exist. Rerun odfcompile with overwrite=True.')
-                            MANIFEST = glob.glob(os.path.join(path, 'MANIFEST*'))
-                            if not os.path.exists(MANIFEST[0]):
-                                logger.log('error', f'Missing {MANIFEST[0]} file in {path}. Missing ODF components? Rerun odfcompile with overwrite=True.')
-                                raise Exception(f'\nMissing {MANIFEST[0]} file in {path}. Missing ODF components? Rerun odfcompile with overwrite=True.')
+                path = sum_sas_path(self.files['sas_odf'])
+                if path is not None:
+                    if not os.path.exists(path):
+                        logger.log('error', f'Summary file PATH {path} does not exist. Rerun odfcompile with overwrite=True.')
+                        raise Exception(f'Summary file PATH {path} does not exist. Rerun odfcompile with overwrite=True.')
+                    MANIFEST = glob.glob(os.path.join(path, 'MANIFEST*'))
+                    if not MANIFEST:
+                        logger.log('error', f'Missing MANIFEST file in {path}. Missing ODF components? Rerun odfcompile with overwrite=True.')
+                        raise Exception(f'\nMissing MANIFEST file in {path}. Missing ODF components? Rerun odfcompile with overwrite=True.')
                 
                 # Set 'SAS_ODF' enviroment variable.
                 os.environ['SAS_ODF'] = self.files['sas_odf']
@@ -456,7 +466,7 @@ class ODFobject(object):
 
                 self.get_active_instruments()
 
-                if not os.path.exists(self.work_dir): os.mkdir(self.work_dir)
+                os.makedirs(self.work_dir, exist_ok=True)
                 # Exit the odfcompile function. Everything is set.
                 return
             else:
@@ -483,9 +493,8 @@ class ODFobject(object):
         # If only PPS files were requested then odfcompile stops here.
         # Else will run cifbuild and odfingest.
         if level == 'PPS':
-            ppsdir = os.path.join(self.data_dir, self.odfid, 'pps')
-            ppssumhtml = 'P' + self.odfid + 'OBX000SUMMAR0000.HTM'
-            ppssumhtmlfull = os.path.join(ppsdir, ppssumhtml)
+            ppsdir = self.pps_dir
+            ppssumhtmlfull = os.path.join(ppsdir, f'P{self.odfid}OBX000SUMMAR0000.HTM')
             ppssumhtmllink = 'file://' + ppssumhtmlfull
             logger.log('info', f'PPS products can be found in {ppsdir}')
             print(f'\nPPS products can be found in {ppsdir}\n\nLink to Observation Summary html: {ppssumhtmllink}')
@@ -496,12 +505,11 @@ class ODFobject(object):
 
             # Checks that the MANIFEST file is there
             MANIFEST = glob.glob('MANIFEST*')
-            try:
-                os.path.exists(MANIFEST[0])
+            if MANIFEST:
                 logger.log('info', f'File {MANIFEST[0]} exists')
-            except FileExistsError:
-                logger.log('error', f'File {MANIFEST[0]} not present. Please check ODF!')
-                print(f'File {MANIFEST[0]} not present. Please check ODF!')
+            else:
+                logger.log('error', 'MANIFEST file not present. Please check ODF!')
+                print('MANIFEST file not present. Please check ODF!')
                 sys.exit(1)
 
             # Here the ODF is fully untarred below odfid subdirectory
@@ -511,7 +519,7 @@ class ODFobject(object):
             os.environ['SAS_ODF'] = self.odf_dir
 
             # Change to working directory
-            if not os.path.exists(self.work_dir): os.mkdir(self.work_dir)
+            os.makedirs(self.work_dir, exist_ok=True)
             os.chdir(self.work_dir)
 
             # Run cifbuild
@@ -534,10 +542,9 @@ class ODFobject(object):
             
             # Check whether ccf.cif is produced or not
             ccfcif = glob.glob('ccf.cif')
-            try:
-                os.path.exists(ccfcif[0])
+            if ccfcif:
                 logger.log('info', f'CIF file {ccfcif[0]} created')
-            except FileExistsError:
+            else:
                 logger.log('error','The ccf.cif was not produced')
                 print('ccf.cif file is not produced')
                 sys.exit(1)
@@ -571,10 +578,9 @@ class ODFobject(object):
 
             # Check whether the SUM.SAS has been produced or not
             sumsas = glob.glob('*SUM.SAS')
-            try:
-                os.path.exists(sumsas[0])
+            if sumsas:
                 logger.log('info', f'SAS summary file {sumsas[0]} created')
-            except FileExistsError:
+            else:
                 logger.log('error','SUM.SAS file was not produced') 
                 print('SUM.SAS file was not produced')
                 sys.exit(1)
@@ -587,17 +593,14 @@ class ODFobject(object):
             self.files['sas_odf'] = fullsumsas
             
             # Check that the SUM.SAS file has the right PATH keyword
-            with open(self.files['sas_odf']) as inf:
-                lines = inf.readlines()
-                for line in lines:
-                    if 'PATH' in line:
-                        key, path = line.split()
-                        if path != self.odf_dir:
-                            logger.log('error', f'SAS summary file PATH {path} mismatchs {self.odf_dir}')
-                            raise Exception(f'SAS summary file PATH {path} mismatchs {self.odf_dir}')
-                        else:
-                            logger.log('info', f'Summary file PATH keyword matches {self.odf_dir}')
-                            print(f'\nWarning: Summary file PATH keyword matches {self.odf_dir}')
+            path = sum_sas_path(self.files['sas_odf'])
+            if path is not None:
+                if path != self.odf_dir:
+                    logger.log('error', f'SAS summary file PATH {path} mismatchs {self.odf_dir}')
+                    raise Exception(f'SAS summary file PATH {path} mismatchs {self.odf_dir}')
+                else:
+                    logger.log('info', f'Summary file PATH keyword matches {self.odf_dir}')
+                    print(f'\nWarning: Summary file PATH keyword matches {self.odf_dir}')
 
             self.get_active_instruments()
 
@@ -627,8 +630,6 @@ class ODFobject(object):
         self.rerun = rerun
         self.logFile = logFile
 
-        print(self.inargs)
-
         # Make sure we are in the right place!
         if os.path.isdir(self.work_dir):
             os.chdir(self.work_dir)
@@ -642,13 +643,8 @@ class ODFobject(object):
 
         if self.task == 'epproc':
             # Check if epproc has already run. If it has, do not run again 
-            exists = False
-            self.files['pnevt_list'] = []
-            for root, dirs, files in os.walk("."):  
-                for filename in files:
-                    if (filename.find('EPN') != -1) and filename.endswith('Evts.ds'):
-                        self.files['pnevt_list'].append(os.path.abspath(os.path.join(root,filename)))
-                        exists = True
+            self.files['pnevt_list'] = find_evts('*EPN*Evts.ds')
+            exists = len(self.files['pnevt_list']) > 0
             if exists and not self.rerun:    
                 print(" > " + str(len(self.files['pnevt_list'])) + " EPIC-pn event list found. Not running epproc again.\n")
                 for x in self.files['pnevt_list']:
@@ -656,13 +652,8 @@ class ODFobject(object):
                 print("..... OK")
             else:
                 w(self.task,self.inargs,logFile=self.logFile).run()      # <<<<< Execute SAS task
-                exists = False
-                self.files['pnevt_list'] = []
-                for root, dirs, files in os.walk("."):  
-                    for filename in files:
-                        if (filename.find('EPN') != -1) and filename.endswith('Evts.ds'):
-                            self.files['pnevt_list'].append(os.path.abspath(os.path.join(root,filename)))
-                            exists = True
+                self.files['pnevt_list'] = find_evts('*EPN*Evts.ds')
+                exists = len(self.files['pnevt_list']) > 0
                 if exists:    
                     print(" > " + str(len(self.files['pnevt_list'])) + " EPIC-pn event list found after running epproc.\n")
                     for x in self.files['pnevt_list']:
@@ -673,17 +664,11 @@ class ODFobject(object):
         
         elif self.task == 'emproc':
             # Check if emproc has already run. If it has, do not run again 
-            exists = False
-            self.files['m1evt_list'] = []
-            self.files['m2evt_list'] = []
-            for root, dirs, files in os.walk("."):  
-                for filename in files:
-                    if (filename.find('EMOS1') != -1) and filename.endswith('ImagingEvts.ds'):
-                        self.files['m1evt_list'].append(os.path.abspath(os.path.join(root,filename)))
-                        exists = True
-                    if (filename.find('EMOS2') != -1) and filename.endswith('ImagingEvts.ds'):
-                        self.files['m2evt_list'].append(os.path.abspath(os.path.join(root,filename)))
-                        exists = True
+            # One directory scan for both MOS cameras.
+            mosevts = find_evts('*EMOS*ImagingEvts.ds')
+            self.files['m1evt_list'] = [f for f in mosevts if 'EMOS1' in os.path.basename(f)]
+            self.files['m2evt_list'] = [f for f in mosevts if 'EMOS2' in os.path.basename(f)]
+            exists = len(self.files['m1evt_list']) + len(self.files['m2evt_list']) > 0
             if exists and not self.rerun:    
                 print(" > " + str(len(self.files['m1evt_list'])) + " EPIC-MOS1 event list found. Not running emproc again.\n")
                 for x in self.files['m1evt_list']:
@@ -694,17 +679,10 @@ class ODFobject(object):
                 print("..... OK")
             else:
                 w(self.task,self.inargs,logFile=self.logFile).run()      # <<<<< Execute SAS task
-                exists = False 
-                self.files['m1evt_list'] = []
-                self.files['m2evt_list'] = []
-                for root, dirs, files in os.walk("."):  
-                    for filename in files:
-                        if (filename.find('EMOS1') != -1) and filename.endswith('ImagingEvts.ds'):
-                            self.files['m1evt_list'].append(os.path.abspath(os.path.join(root,filename)))
-                            exists = True 
-                        if (filename.find('EMOS2') != -1) and filename.endswith('ImagingEvts.ds'):
-                            self.files['m2evt_list'].append(os.path.abspath(os.path.join(root,filename)))
-                            exists = True            
+                mosevts = find_evts('*EMOS*ImagingEvts.ds')
+                self.files['m1evt_list'] = [f for f in mosevts if 'EMOS1' in os.path.basename(f)]
+                self.files['m2evt_list'] = [f for f in mosevts if 'EMOS2' in os.path.basename(f)]
+                exists = len(self.files['m1evt_list']) + len(self.files['m2evt_list']) > 0
                 if exists:    
                     print(" > " + str(len(self.files['m1evt_list'])) + " EPIC-MOS1 event list found after running emproc.\n")
                     for x in self.files['m1evt_list']:
@@ -790,6 +768,114 @@ class ODFobject(object):
 
         return
 
+# Matches the PATH keyword line of a SAS summary file.
+_PATH_RE = re.compile(rb'^PATH[ \t]+(\S+)', re.M)
+
+def sum_sas_path(sas_odf):
+    """
+    Returns the value of the PATH keyword in the SAS summary file sas_odf,
+    or None if there is none. Stops reading at the PATH line.
+    """
+    with open(sas_odf, 'rb') as inf:
+        # PATH is normally near the top, so search the first few KB first.
+        # Only whole lines are searched, so a value is never cut short.
+        head = inf.read(8192)
+        if len(head) == 8192:
+            head = head[:head.rfind(b'\n') + 1]
+        m = _PATH_RE.search(head)
+        if m:
+            return m.group(1).decode()
+        # Not found there. Scan the rest of the file line by line.
+        inf.seek(len(head))
+        for line in inf:
+            words = line.split()
+            if words and words[0] == b'PATH' and len(words) > 1:
+                return words[1].decode()
+    return None
+
+def find_evts(pattern):
+    """
+    Returns the absolute paths of all files below the current directory
+    whose names match pattern, e.g. '*EPN*Evts.ds'.
+    """
+    return [os.path.abspath(f) for f in glob.glob(f'**/{pattern}', recursive=True)]
+
+def find_files(root, *predicates):
+    """
+    Walks the tree below root once and returns a list with, for each
+    predicate, the path of the first file whose name satisfies it, or None.
+    A predicate given as None is skipped. The walk stops as soon as every
+    predicate has a match.
+    """
+    found = [None] * len(predicates)
+    missing = sum(predicate is not None for predicate in predicates)
+    stack = [root]
+    while stack and missing:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                for i, predicate in enumerate(predicates):
+                    if predicate is not None and found[i] is None and predicate(entry.name):
+                        found[i] = entry.path
+                        missing -= 1
+                        break
+                if not missing:
+                    break
+    return found
+
+def extract_members(tar, dest):
+    """
+    Extracts all members of the open tar file tar into dest, in archive
+    order. Owners are taken as numeric ids, so no user or group name
+    lookups are done. The 'data' extraction filter is used where the
+    Python version supports it.
+    """
+    if hasattr(tarfile, 'data_filter'):
+        tar.extractall(path=dest, numeric_owner=True, filter='data')
+    else:
+        tar.extractall(path=dest, numeric_owner=True)
+
+def extract_tar_gz(tarpath, dest):
+    """
+    Extracts the gzipped tar file tarpath into the directory dest.
+    If rapidgzip is installed it is used to decompress on all cores,
+    otherwise the gzip module (isal if installed) is used.
+    """
+    if rapidgzip is not None:
+        gz = rapidgzip.open(tarpath, parallelization=os.cpu_count())
+    else:
+        gz = gzip.open(tarpath, 'rb')
+    with gz:
+        with tarfile.open(fileobj=gz, mode="r|") as tar:
+            extract_members(tar, dest)
+
+def gunzip_file(file):
+    """
+    Decompresses file (ending in .gz) next to itself and removes file.
+    Returns file.
+    """
+    with gzip.open(file, 'rb') as f_in:
+        with open(file[:-3], 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out, length=1<<20)
+    os.remove(file)
+    return file
+
+def link_or_copy(src, dst):
+    """
+    Hard links src to dst, so no data is copied. Falls back to copying
+    the file contents if src and dst are on different filesystems or a
+    link is not allowed. copyfile skips copying metadata and lets the
+    OS copy the data directly (copy_file_range/sendfile on Linux).
+    Returns dst.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+    return dst
+
 def generate_logger(logname=None,log_dir=None):
     """
     
@@ -883,17 +969,16 @@ def download_data(odfid,data_dir,level='ODF',encryption_key=None,repo='esa',logg
             level = ['ODF','PPS']
         else:
             level = [level]
+        # Download the odfid from ESA, using astroquery
+        from astroquery.esa.xmm_newton import XMMNewton
         for levl in level:
-            # Download the odfid from ESA, using astroquery
-            from astroquery.esa.xmm_newton import XMMNewton
             logger.log('info', f'Downloading {odfid}, level {levl} into {obs_dir}')
             print(f'\nDownloading {odfid}, level {levl} into {obs_dir}. Please wait ...\n')
             XMMNewton.download_data(odfid, level=levl)
             # Check that the tar.gz file has been downloaded
-            try:
-                os.path.exists(odftar)
+            if os.path.exists(odftar):
                 logger.log('info', f'{odftar} found.') 
-            except FileExistsError:
+            else:
                 logger.log('error', f'File {odftar} is not present. Not downloaded?')
                 print(f'File {odftar} is not present. Not downloaded?')
                 sys.exit(1)
@@ -908,11 +993,10 @@ def download_data(odfid,data_dir,level='ODF',encryption_key=None,repo='esa',logg
             print(f'\nUnpacking {odftar} ...\n')
 
             try:
-                with tarfile.open(odftar,"r:gz") as tar:
-                    if levl == 'ODF':
-                        tar.extractall(path=odf_dir)
-                    elif levl == 'PPS':
-                        tar.extractall(path=pps_dir)
+                if levl == 'ODF':
+                    extract_tar_gz(odftar, odf_dir)
+                elif levl == 'PPS':
+                    extract_tar_gz(odftar, pps_dir)
                 os.remove(odftar)
                 logger.log('info', f'{odftar} extracted successfully!')
                 logger.log('info', f'{odftar} removed')
@@ -927,23 +1011,32 @@ def download_data(odfid,data_dir,level='ODF',encryption_key=None,repo='esa',logg
             levl = level
         logger.log('info', f'Downloading {odfid}, level {levl}')
         print(f'\nDownloading {odfid}, level {level}. Please wait ...\n')
-        cmd = f'wget -m -nH -e robots=off --cut-dirs=4 -l 2 -np https://heasarc.gsfc.nasa.gov/FTP/xmm/data/rev0/{odfid}/{levl}'
-        result = subprocess.run(cmd, shell=True)
+        # The index.html listing pages are rejected by wget as it goes,
+        # rather than removed afterwards.
+        cmd = ['wget', '-m', '-nH', '-e', 'robots=off', '--cut-dirs=4', '-l', '2', '-np',
+               '-R', 'index.html*',
+               f'https://heasarc.gsfc.nasa.gov/FTP/xmm/data/rev0/{odfid}/{levl}']
+        result = subprocess.run(cmd)
         if result.returncode != 0:
             print(f'Problem downloading data!')
             logger.log('error', f'File download failed!')
             raise Exception('File download failed!')
+        # Remove 4XMM directories and the level not asked for. Removed
+        # directories are also dropped from the walk.
+        if level == 'ODF':
+            drop_dirs = frozenset({'PPS'})
+        elif level == 'PPS':
+            drop_dirs = frozenset({'ODF'})
+        else:
+            drop_dirs = frozenset()
         for path, directories, files in os.walk('.'):
-            for file in files:
-                if 'index.html' in file:
-                    os.remove(os.path.join(path,file))
+            keep = []
             for direc in directories:
-                if '4XMM' in direc:
-                    shutil.rmtree(os.path.join(path,direc))
-                if level == 'ODF' and direc == 'PPS':
-                    shutil.rmtree(os.path.join(path,direc))
-                if level == 'PPS' and direc == 'ODF':
+                if direc in drop_dirs or '4XMM' in direc:
                     shutil.rmtree(os.path.join(path,direc))
+                else:
+                    keep.append(direc)
+            directories[:] = keep
     elif repo == 'sciserver':
         # Copies data into personal storage space.
         dest_dir = obs_dir
@@ -959,10 +1052,22 @@ def download_data(odfid,data_dir,level='ODF',encryption_key=None,repo='esa',logg
         archive_data = f'/home/idies/workspace/headata/FTP/xmm/data/rev0//{odfid}/{levl}'
         logger.log('info', f'Copying data from {archive_data} ...')
         print(f'\nCopying data from {archive_data} ...')
-        shutil.copytree(archive_data,dest_dir,dirs_exist_ok=True)
+        # Files are hard linked where possible, otherwise copied.
+        shutil.copytree(archive_data,dest_dir,dirs_exist_ok=True,copy_function=link_or_copy)
+
+    # Sort the downloaded files by type in a single walk. Files produced by
+    # decryption or decompression are added to the later lists as they appear.
+    encrypted, gzfiles, tarfiles = [], [], []
+    for path, directories, files in os.walk('.'):
+        for file in files:
+            if file.endswith('.gpg'):
+                encrypted.append(os.path.join(path,file))
+            elif file.endswith('.gz'):
+                gzfiles.append(os.path.join(path,file))
+            elif file.endswith('.TAR'):
+                tarfiles.append(os.path.join(path,file))
 
     # Check if data is encrypted. Decrypt the data.
-    encrypted = glob.glob('**/*.gpg', recursive=True)
     if len(encrypted) > 0:
         logger.log('info', f'Encrypted files found! Decrypting files!')
 
@@ -970,19 +1075,20 @@ def download_data(odfid,data_dir,level='ODF',encryption_key=None,repo='esa',logg
         # If no encryption key is given then go looking for a file.
         encryption_file = None
         if encryption_key == None:
-            encryption_file = glob.glob(os.path.join(self.data_dir,f'*{odfid}*'))
+            encryption_file = glob.glob(os.path.join(data_dir,f'*{odfid}*'))
             if len(encryption_file) == 0:
-                encryption_file = glob.glob(os.path.join(self.data_dir,'*key*'))
+                encryption_file = glob.glob(os.path.join(data_dir,'*key*'))
             if len(encryption_file) > 1:
                 logger.log('error', 'Multiple possible encryption key files. Specify encryption key file.')
                 raise Exception('Multiple possible encryption key files.')
             if len(encryption_file) == 0:
                 encryption_file = 'None'
             if os.path.isfile(encryption_file[0]):
+                encryption_file = encryption_file[0]
                 logger.log('info', f'File with encryption key found: {encryption_file}')
             else:
                 print('File decryption failed. No encryption key found.')
-                print(f'Regular file with the encryption key needs to be placed in: {self.data_dir}')
+                print(f'Regular file with the encryption key needs to be placed in: {data_dir}')
                 logger.log('error', 'File decryption failed. No encryption key found.')
                 raise Exception('File decryption failed. No encryption file found.')
         elif os.path.isfile(encryption_key):
@@ -990,16 +1096,17 @@ def download_data(odfid,data_dir,level='ODF',encryption_key=None,repo='esa',logg
             encryption_file = encryption_key
         if encryption_file is not None:
             logger.log('info', f'Reading ecryption key from: {encryption_file}')
+            # The key is on the first line. An empty file gives no key.
             with open(encryption_file) as f:
-                lines = f.readlines()
-                encryption_key = lines[0]
+                encryption_key = f.readline() or None
         if encryption_key == None:
             print(f'No encryption key found in {encryption_file}')
-            print(f'Regular file with the encryption key needs to be placed in: {self.data_dir}')
+            print(f'Regular file with the encryption key needs to be placed in: {data_dir}')
             logger.log('error', 'File decryption failed. No encryption key found.')
             raise Exception('File decryption failed. No encryption key found.')
         
             
+        to_decrypt = []
         for file in encrypted:
             out_file = file[:-4]
             if os.path.exists(out_file):
@@ -1007,32 +1114,44 @@ def download_data(odfid,data_dir,level='ODF',encryption_key=None,repo='esa',logg
                 print(f'Already decrypted file found: {out_file}')
             else:
                 logger.log('info', f'Decrypting {file}')
-                cmd = 'echo {0} | gpg --batch -o {1} --passphrase-fd 0 -d {2}'.format(encryption_key,out_file,file)
-                result = subprocess.run(cmd, shell=True)
-                if result.returncode != 0:
-                    print(f'Problem decrypting {file}')
-                    logger.log('error', f'File decryption failed, key used {encryption_key}')
-                    raise Exception('File decryption failed')
+                to_decrypt.append(file)
+
+        if to_decrypt:
+            # A single gpg process decrypts every file, writing each one next
+            # to itself without the .gpg suffix. The key is passed on stdin.
+            cmd = ['gpg', '--batch', '--yes', '--passphrase-fd', '0', '--decrypt-files'] + to_decrypt
+            result = subprocess.run(cmd, input=encryption_key.strip()+'\n', text=True)
+            if result.returncode != 0:
+                print(f'Problem decrypting files')
+                logger.log('error', f'File decryption failed, key used {encryption_key}')
+                raise Exception('File decryption failed')
+            for file in to_decrypt:
                 os.remove(file)
                 logger.log('info', f'{file} removed')
+                out_file = file[:-4]
+                if out_file.endswith('.gz'):
+                    gzfiles.append(out_file)
+                elif out_file.endswith('.TAR'):
+                    tarfiles.append(out_file)
     else:
         logger.log('info','No encrypted files found.')
 
-    for file in glob.glob('**/*.gz', recursive=True):
+    # zlib releases the GIL while inflating, so threads are enough to
+    # unpack the files in parallel.
+    for file in gzfiles:
         logger.log('info', f'Unpacking {file} ...')
         print(f'Unpacking {file} ...')
-        with gzip.open(f'{file}', 'rb') as f_in:
-            out_file = file[:-3]
-            with open(out_file, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
-        os.remove(file)
-        logger.log('info', f'{file} removed')
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for file in executor.map(gunzip_file, gzfiles):
+            logger.log('info', f'{file} removed')
+            if file.endswith('.TAR.gz'):
+                tarfiles.append(file[:-3])
 
-    for file in glob.glob('**/*.TAR', recursive=True):
+    for file in tarfiles:
         logger.log('info', f'Unpacking {file} ...')
         print(f'Unpacking {file} ...')
-        with tarfile.open(file,"r") as tar:
-            tar.extractall(path=odf_dir)
+        with tarfile.open(file,"r|") as tar:
+            extract_members(tar, odf_dir)
         os.remove(file)
         logger.log('info', f'{file} removed')
     
@@ -30,6 +30,8 @@ printHelp:		Prints a table with the parameters read from xmlFile.
 defaultValues: 	Returns a dictionary with the default values for each parameter.
 
 Functions:
+find_parfile(parfile):      Finds the full path of a parameter file in SAS_PATH
+parse_parfile(xmlFile):     Parses a parameter file, reusing an earlier parse
 att(p):                     Fills in the attributes of parameter p
 getsub(p):                  Obtains the sub-parameters of parameter p
 el2nam(p, pels):            Gets the name of parameter element p
@@ -47,13 +49,55 @@ t.xmlParser()
 from xml.dom import minidom as md
 import os
 import sys
-import glob
 
 # Third party imports
 from beautifultable import BeautifulTable
 
 # Local application imports
 from pysas.error import Error as Err
+from pysas.init_sas import ensure_sas_initialized
+
+
+# Parameter files found so far, keyed on (SAS_PATH, parfile). Keying on
+# SAS_PATH means a re-initialization of SAS is picked up automatically.
+_parfile_paths = {}
+
+def find_parfile(parfile):
+    """
+    Returns the full path of parfile in the first SAS_PATH directory whose
+    config subdirectory contains it, or '' if there is none. Only found
+    files are remembered, so a file added later is still picked up.
+    """
+    sas_path = os.environ.get('SAS_PATH', '')
+    key = (sas_path, parfile)
+    xmlFile = _parfile_paths.get(key)
+    if xmlFile is None:
+        xmlFile = ''
+        for path in filter(None, sas_path.split(os.pathsep)):
+            fullpath = os.path.join(path, 'config', parfile)
+            if os.path.isfile(fullpath):
+                xmlFile = fullpath
+                _parfile_paths[key] = xmlFile
+                break
+    return xmlFile
+
+# Parsed parameter files, keyed on path. The modification time is kept
+# with each Document so that an edited file is parsed again.
+_parfile_docs = {}
+
+def parse_parfile(xmlFile):
+    """
+    Returns the parsed Document of the parameter file xmlFile, parsing
+    it only the first time or if it has changed since. The Document is
+    shared between callers and must not be modified.
+    """
+    mtime = os.stat(xmlFile).st_mtime_ns
+    cached = _parfile_docs.get(xmlFile)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    doc = md.parse(xmlFile)
+    _parfile_docs[xmlFile] = (mtime, doc)
+    return doc
 
 
 class paramXmlInfoReader:
@@ -75,13 +119,9 @@ class paramXmlInfoReader:
         self.taskname = taskname
         self.xmlFile = ''
 
-        sas_path = os.environ['SAS_PATH'].split(':')
-        for path in sas_path:
-            parfile = self.taskname + '.par'
-            files = glob.glob(os.path.join(path, 'config', parfile))
-            if files:
-                self.xmlFile = files[0]
-                break
+        ensure_sas_initialized()
+        parfile = self.taskname + '.par'
+        self.xmlFile = find_parfile(parfile)
 
         if self.xmlFile == '':
             raise Exception(f'Does not exist any file named {parfile}. Wrong syntax?')
@@ -151,7 +191,7 @@ class paramXmlInfoReader:
         """
 
         try:
-            doc = md.parse(self.xmlFile)
+            doc = parse_parfile(self.xmlFile)
         except:
             Err(client=self.taskname,
                 code='openFileError',
@@ -161,18 +201,14 @@ class paramXmlInfoReader:
         # self.params
         self.params = doc.getElementsByTagName('PARAM')
 
-        # Dictionary allparams
+        # Dictionary allparams and pels dictionary, built together so the
+        # attributes of each parameter are read only once.
         self.allparams = {}
+        self.pels = {}
         for p in self.params:
             attrib = self.att(p)
             pname = attrib['id']
             self.allparams[pname] = attrib
-
-        # pels dictionary
-
-        self.pels = {}
-        for p in self.params:
-            pname = self.att(p)['id']
             self.pels[p] = pname
 
         # reverse pels dictionary
@@ -197,9 +233,9 @@ class paramXmlInfoReader:
         # mandpar
 
         self.mandpar = []
-        for p in self.params:
-            if self.att(p)['mandatory'] == 'yes':
-                self.mandpar.append(self.att(p)['id'])
+        for pname, attrib in self.allparams.items():
+            if attrib['mandatory'] == 'yes':
+                self.mandpar.append(pname)
 
         # mainparams
 
@@ -295,17 +331,18 @@ class paramXmlInfoReader:
         attrib = {}
         for k, v in p.attributes.items():
             attrib[k] = v
-        if 'mandatory' not in attrib.keys():
+        if 'mandatory' not in attrib:
             attrib['mandatory'] = 'no'
-        if 'list' not in attrib.keys():
+        if 'list' not in attrib:
             attrib['list'] = 'no'
         # All parameters have a DESCRIPTION node after them
-        if p.getElementsByTagName('DESCRIPTION').length == 0:
+        descriptions = p.getElementsByTagName('DESCRIPTION')
+        if descriptions.length == 0:
             description = ''
-        elif p.getElementsByTagName('DESCRIPTION')[0].firstChild == None:
+        elif descriptions[0].firstChild == None:
             description = ''
         else:
-            description = p.getElementsByTagName('DESCRIPTION')[0].firstChild.data
+            description = descriptions[0].firstChild.data
             description = description.strip('\n')
             description = description.strip()
         attrib['description'] = description
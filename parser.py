@@ -43,12 +43,10 @@ Task parameters entered are returned in list tparams.
 
 # Standard library imports
 import os
-import sys
 import subprocess
 import argparse
 import pkgutil
 from importlib import import_module
-from contextlib import suppress
 
 # Third party imports
 
@@ -84,8 +82,8 @@ class ParseArgs:
         else:
             # Do not use --version because some SAS perl tasks like epchain do not 
             # accept this option but only -v
-            cmd = self.taskname + ' -v'
-            self.version = subprocess.check_output(cmd, shell=True, text=True)
+            cmd = [self.taskname, '-v']
+            self.version = subprocess.check_output(cmd, text=True)
 
     # This is the task parser constructor
     def taskparser(self):
@@ -38,6 +38,7 @@ import pkgutil, os, sys, subprocess
 # Third party imports
 
 # Local application imports
+from pysas.init_sas import ensure_sas_initialized
 
 
 class RunTask:
@@ -67,6 +68,7 @@ class RunTask:
             a run function, so we will invoke subprocess
             """
 
+        ensure_sas_initialized()
         sas_path = os.environ.get('SAS_PATH')
 
         if not sas_path:
@@ -109,7 +109,6 @@ The runtask method uses class RunTask.
 
 # Standard library imports
 from abc import ABC, abstractmethod
-import os
 
 # Third party imports
 
@@ -117,6 +116,7 @@ import os
 from pysas.param import paramXmlInfoReader
 from pysas.parser import ParseArgs
 from pysas.runtask import RunTask
+from pysas.init_sas import ensure_sas_initialized
 
 
 # Class SASTask
@@ -132,6 +132,7 @@ class SASTask(ABC):
     """
 
     def __init__(self, taskname, inargs):
+        ensure_sas_initialized()
         self.name = taskname
         self.inargs = inargs
 
@@ -187,6 +188,8 @@ class MyTask(SASTask):
             # Get dict of default inputs for the task.
             t = paramXmlInfoReader(self.taskname)
             t.xmlParser()
+            # Kept so that readparfile does not parse the file again.
+            self.paramXmlInfo = t
             defdict = t.defaultValues()
             defkeys = defdict.keys()
             inkeys = self.inargs.keys()
@@ -232,9 +235,12 @@ class MyTask(SASTask):
         return f'{self.__class__.__name__}({self.taskname} - {self.inargs})'
 
     def readparfile(self):
-        t = paramXmlInfoReader(self.taskname)
-        t.xmlParser()
-        self.paramXmlInfo = t
+        # Reuse the parameter file already read in __init__, if any.
+        t = getattr(self, 'paramXmlInfo', None)
+        if t is None:
+            t = paramXmlInfoReader(self.taskname)
+            t.xmlParser()
+            self.paramXmlInfo = t
         self.allparams = t.allparams
         self.mandparams = t.mandpar
         self.mainparams = t.mainparams
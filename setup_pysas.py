@@ -56,20 +56,36 @@
 
 
 # Standard library imports
-import os, subprocess, time, glob
+import os, sys, glob
 
 # Third party imports
 
 # Local application imports
-from pysas.configutils import sas_cfg, set_sas_config_option
-from pysas.init_sas import initializesas
+# pysas.configutils creates the config file on import, so the pysas modules
+# are imported in main(), along with what is only needed there.
 
 __version__ = 'setuppysas (setuppysas-0.1)'
 
-verbosity        = sas_cfg.get('sas','verbosity')
-suppress_warning = sas_cfg.get('sas','suppress_warning')
+def input_not_recognized(response, accepted, alternatives):
+    print(f'Your response, {response}, is not recognized.\n'
+          f'Try any of these: {sorted(accepted)}\n'
+          f'-or any of these: {sorted(alternatives)}')
+    raise Exception('Input not recognized!')
+
+def main():
+    if not sys.stdin.isatty():
+        print('setup_pysas requires an interactive terminal')
+        return
+
+    import subprocess, time
+    from pysas import configutils
+    from pysas.configutils import set_sas_config_option
+    from pysas.init_sas import initializesas
 
-outcomment = """
+    verbosity        = configutils.CFG.verbosity
+    suppress_warning = configutils.CFG.suppress_warning
+
+    outcomment = """
 
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -109,171 +125,152 @@ outcomment = """
 
 """
 
-print(outcomment)
-
-positive = ['y','yes','ye','yeah','yea','ys','aye','yup','totally','si','oui']
-negative = ['n','no','not','nay','no way','nine','non']
-esa = ['esa','e','es','europe']
-nasa = ['nasa','n','na','nas','ns','nsa','us','usa']
-
-############## Getting sas_dir ##############
-script_path = path = os.path.normpath(os.path.abspath(__file__))
-split_path = path.split(os.sep)
-
-if split_path[-2] == 'pysas' and split_path[-3] == 'python' and split_path[-4] == 'lib' and split_path[-5][0:7] == 'xmmsas_':
-    psas_dir = os.sep
-    for folder in split_path[:-4]:
-        psas_dir = os.path.join(psas_dir,folder)
-    print('Is this the correct SAS directory?')
-    print('\n    {0}\n'.format(psas_dir))
-    response = input('y/n: ')
-    response = response.lower()
-    if response in positive:
-        sas_dir = psas_dir
-        print(f'Setting SAS_DIR = {sas_dir}')
-    elif response in negative:
+    print(outcomment)
+
+    positive = frozenset({'y','yes','ye','yeah','yea','ys','aye','yup','totally','si','oui'})
+    negative = frozenset({'n','no','not','nay','no way','nine','non'})
+    esa = frozenset({'esa','e','es','europe'})
+    nasa = frozenset({'nasa','n','na','nas','ns','nsa','us','usa'})
+
+    ############## Getting sas_dir ##############
+    script_path = path = os.path.normpath(os.path.abspath(__file__))
+    split_path = path.split(os.sep)
+
+    if split_path[-2] == 'pysas' and split_path[-3] == 'python' and split_path[-4] == 'lib' and split_path[-5][0:7] == 'xmmsas_':
+        psas_dir = os.sep
+        for folder in split_path[:-4]:
+            psas_dir = os.path.join(psas_dir,folder)
+        print('Is this the correct SAS directory?')
+        print('\n    {0}\n'.format(psas_dir))
+        response = input('y/n: ').strip().lower()
+        if response in positive:
+            sas_dir = psas_dir
+            print(f'Setting SAS_DIR = {sas_dir}')
+        elif response in negative:
+            # Ask for SAS_DIR path
+            scomment = '\nPlease provide the full path to the SAS install directory (SAS_DIR).\n'
+            print(scomment)
+            sas_dir = input('Full path to SAS: ')
+        else:
+            input_not_recognized(response, positive, negative)
+    else:
         # Ask for SAS_DIR path
         scomment = '\nPlease provide the full path to the SAS install directory (SAS_DIR).\n'
         print(scomment)
         sas_dir = input('Full path to SAS: ')
-    else:
-        print(f'Your response, {response}, is not recognized.')
-        print(f'Try any of these: {positive}')
-        print(f'-or any of these: {negative}')
-        raise Exception('Input not recognized!')
-else:
-    # Ask for SAS_DIR path
-    scomment = '\nPlease provide the full path to the SAS install directory (SAS_DIR).\n'
-    print(scomment)
-    sas_dir = input('Full path to SAS: ')
 
-if not sas_dir.startswith('/'): sas_dir = os.path.abspath(sas_dir)
-if sas_dir.endswith('/'): sas_dir = sas_dir[:-1]
-if not os.path.exists(sas_dir):
-    print(f'SAS path {sas_dir} does not exist! Check path or SAS install!')
-    raise Exception(f'SAS path {sas_dir} does not exist!')
+    if not sas_dir.startswith('/'): sas_dir = os.path.abspath(sas_dir)
+    if sas_dir.endswith('/'): sas_dir = sas_dir[:-1]
+    if not os.path.exists(sas_dir):
+        print(f'SAS path {sas_dir} does not exist! Check path or SAS install!')
+        raise Exception(f'SAS path {sas_dir} does not exist!')
 
-pysas_dir = glob.glob(sas_dir+'/lib/python')[0]
-bashfile = os.path.join(os.path.expanduser('~'),'.bash_profile')
-if os.path.exists(bashfile):
-    with open(bashfile, "a") as myfile:
-        myfile.write(f'export PYTHONPATH={pysas_dir}:$PYTHONPATH')
-    print(f'Adding {pysas_dir} to PYTHONPATH in {bashfile}')
+    pysas_dir = glob.glob(sas_dir+'/lib/python')[0]
+    bashfile = os.path.join(os.path.expanduser('~'),'.bash_profile')
+    if os.path.exists(bashfile):
+        with open(bashfile, "a") as myfile:
+            myfile.write(f'export PYTHONPATH={pysas_dir}:$PYTHONPATH')
+        print(f'Adding {pysas_dir} to PYTHONPATH in {bashfile}')
 
-print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
+    print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
 
-############## Getting sas_ccfpath ##############
+    ############## Getting sas_ccfpath ##############
 
-scomment = """
+    scomment = """
     SAS_CCFPATH not set.
 
     Please provide the full path to the SAS calibration directory (SAS_CCFPATH).
 
 """
-print(scomment)
-sas_ccfpath = input('Full path to calibration files: ')
-if not sas_ccfpath.startswith('/'): sas_ccfpath = os.path.abspath(sas_ccfpath)
-if sas_ccfpath.endswith('/'): sas_ccfpath = sas_ccfpath[:-1]
-
-create_ccf = False
-if not os.path.exists(sas_ccfpath):
-    print(f'The directory {sas_ccfpath} was not found!')
-    response = input('Should I create it? (y/n): ')
-    response = response.lower()
-    if response in positive:
-        sas_dir = psas_dir
-        print(f'Creating: {sas_ccfpath}')
-        os.mkdir(sas_ccfpath)
-    elif response in negative:
-        print('\nPlease create the directory for the calibration files!\n')
-    else:
-        print(f'Your response, {response}, is not recognized.')
-        print(f'Try any of these: {positive}')
-        print(f'-or any of these: {negative}')
-        raise Exception('Input not recognized!')
+    print(scomment)
+    sas_ccfpath = input('Full path to calibration files: ')
+    if not sas_ccfpath.startswith('/'): sas_ccfpath = os.path.abspath(sas_ccfpath)
+    if sas_ccfpath.endswith('/'): sas_ccfpath = sas_ccfpath[:-1]
+
+    if not os.path.exists(sas_ccfpath):
+        print(f'The directory {sas_ccfpath} was not found!')
+        response = input('Should I create it? (y/n): ').strip().lower()
+        if response in positive:
+            print(f'Creating: {sas_ccfpath}')
+            os.makedirs(sas_ccfpath, exist_ok=True)
+        elif response in negative:
+            print('\nPlease create the directory for the calibration files!\n')
+        else:
+            input_not_recognized(response, positive, negative)
         
-download_calibration = False
-esa_or_nasa = ''
-print('Would you like to download the current valid set of calibration files?\nWill download at the end of this script.')
-response2 = input('(y/n): ')
-response2 = response2.lower()
-if response2 in positive:
-    download_calibration = True
-    print('Which repository do you want to use to download the calibration files?')
-    esa_or_nasa = input('ESA or NASA: ')
-    esa_or_nasa = esa_or_nasa.lower()
-    if esa_or_nasa in esa+nasa:
-        pass
+    download_calibration = False
+    esa_or_nasa = ''
+    print('Would you like to download the current valid set of calibration files?\nWill download at the end of this script.')
+    response2 = input('(y/n): ').strip().lower()
+    if response2 in positive:
+        download_calibration = True
+        print('Which repository do you want to use to download the calibration files?')
+        esa_or_nasa = input('ESA or NASA: ').strip().lower()
+        if esa_or_nasa in esa or esa_or_nasa in nasa:
+            pass
+        else:
+            input_not_recognized(esa_or_nasa, esa, nasa)
+    elif response2 in negative:
+        print('Please make sure you download the calibration data!')
     else:
-        print(f'Your response, {esa_or_nasa}, is not recognized.')
-        print(f'Try any of these: {esa}')
-        print(f'-or any of these: {nasa}')
-        raise Exception('Input not recognized!')
-elif response2 in negative:
-    print('Please make sure you download the calibration data!')
-else:
-    print(f'Your response, {response2}, is not recognized.')
-    print(f'Try any of these: {positive}')
-    print(f'-or any of these: {negative}')
-    raise Exception('Input not recognized!')
+        input_not_recognized(response2, positive, negative)
     
 
-print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
+    print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
 
-############## Getting data_dir ##############
+    ############## Getting data_dir ##############
 
-scomment = """
+    scomment = """
     No default data directory.
 
     Please provide the full path to the user data directory.
     (OPTIONAL, but recommended)
 
 """
-print(scomment)
-data_dir = input('Full path to user data directory: ')
-if not data_dir.startswith('/'): data_dir = os.path.abspath(data_dir)
-if data_dir.endswith('/'): data_dir = data_dir[:-1]
-print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
-
-# Check if data_dir exists. If not then create it.
-if not os.path.isdir(data_dir):
-    print(f'{data_dir} does not exist. Creating it!')
-    os.mkdir(data_dir)
-    print(f'{data_dir} has been created!')
-else:
-    print(f'\nData directory exists. Will use {data_dir} to download data.')
-set_sas_config_option('data_dir',data_dir)
-
-# Check if paths for SAS_DIR and SAS_CCFPATH exist.
-if os.path.exists(sas_dir) and os.path.exists(sas_ccfpath):
-    print('SAS_DIR and SAS_CCFPATH exist. Will use SAS_DIR and SAS_CCFPATH to initialize SAS.')
-    set_sas_config_option('sas_dir',sas_dir)
-    set_sas_config_option('sas_ccfpath',sas_ccfpath)
-    initializesas(sas_dir, sas_ccfpath, verbosity=verbosity,suppress_warning=suppress_warning)
-else:
-    if not os.path.exists(sas_dir):
-        print(f'There is a problem with SAS_DIR {sas_dir}. Please check and try again.')
-        raise Exception(f'There is a problem with SAS_DIR {sas_dir}. Please check and try again.')
+    print(scomment)
+    data_dir = input('Full path to user data directory: ')
+    if not data_dir.startswith('/'): data_dir = os.path.abspath(data_dir)
+    if data_dir.endswith('/'): data_dir = data_dir[:-1]
+    print('\n~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
+
+    # Check if data_dir exists. If not then create it.
+    if not os.path.isdir(data_dir):
+        print(f'{data_dir} does not exist. Creating it!')
+        os.makedirs(data_dir, exist_ok=True)
+        print(f'{data_dir} has been created!')
+    else:
+        print(f'\nData directory exists. Will use {data_dir} to download data.')
+    set_sas_config_option('data_dir',data_dir)
+
+    # SAS_DIR was already checked above, so only SAS_CCFPATH is left to check.
+    if os.path.exists(sas_ccfpath):
+        print('SAS_DIR and SAS_CCFPATH exist. Will use SAS_DIR and SAS_CCFPATH to initialize SAS.')
+        set_sas_config_option('sas_dir',sas_dir)
+        set_sas_config_option('sas_ccfpath',sas_ccfpath)
+        initializesas(sas_dir, sas_ccfpath, verbosity=verbosity,suppress_warning=suppress_warning)
     else:
         print(f'Default SAS_DIR = {sas_dir}')
-
-    if not os.path.exists(sas_ccfpath):
         print(f'There is a problem with SAS_CCFPATH {sas_ccfpath}. Please check and try again.')
         raise Exception(f'There is a problem with SAS_CCFPATH {sas_ccfpath}. Please check and try again.')
-    else:
-        print(f'Default SAS_CCFPATH = {sas_ccfpath}')
-
-if download_calibration:
-    if esa_or_nasa in esa:
-        cmd = f'rsync -v -a --delete --delete-after --force --include=\'*.CCF\' --exclude=\'*/\' sasdev-xmm.esac.esa.int::XMM_VALID_CCF {sas_ccfpath}'
-    elif esa_or_nasa in nasa:
-        cmd = f'wget -m -nH --cut-dirs=4 -e robots=off -l 2 -np -R "index.html*" https://heasarc.gsfc.nasa.gov/FTP/xmm/data/CCF -P {sas_ccfpath}'
-    print(f'Downloading calibration data using the command:\n{cmd}')
-    print('This may take a while.')
-    time.sleep(3)
-    result = subprocess.run(cmd, shell=True)
-
-scomment = f"""
+
+    if download_calibration:
+        # Run without a shell. Output goes straight to the terminal.
+        if esa_or_nasa in esa:
+            cmd = ['rsync', '-v', '-a', '--delete', '--delete-after', '--force',
+                   '--include=*.CCF', '--exclude=*/',
+                   'sasdev-xmm.esac.esa.int::XMM_VALID_CCF', sas_ccfpath]
+        elif esa_or_nasa in nasa:
+            cmd = ['wget', '-m', '-nH', '--cut-dirs=4', '-e', 'robots=off', '-l', '2', '-np',
+                   '-R', 'index.html*',
+                   'https://heasarc.gsfc.nasa.gov/FTP/xmm/data/CCF', '-P', sas_ccfpath]
+        print(f'Downloading calibration data using the command:\n{" ".join(cmd)}')
+        print('This may take a while.')
+        time.sleep(3)
+        result = subprocess.run(cmd)
+        if result.returncode != 0:
+            print('Problem downloading calibration data! Please download it manually.')
+
+    scomment = f"""
     Success!
 
     SAS_DIR set to {sas_dir}
@@ -294,4 +291,7 @@ scomment = f"""
         clear_sas_defaults()
 
 """
-print(scomment)
\ No newline at end of file
+    print(scomment)
+
+if __name__ == '__main__':
+    main()
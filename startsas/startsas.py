@@ -95,12 +95,36 @@ import os, sys, subprocess, shutil, glob
 # Local application imports
 from .version import VERSION, SAS_RELEASE, SAS_AKA
 #from pysas.wrapper import Wrapper as wrap
-from pysas.logger import TaskLogger as TL
 
 
 __version__ = f'startsas (startsas-{VERSION}) [{SAS_RELEASE}-{SAS_AKA}]' 
 
-logger = TL('startsas')
+class _LazyLogger:
+    """
+    Stands in for a TaskLogger, which is only created (opening its log
+    file) on the first call to log().
+    """
+    __slots__ = ('_name', '_real')
+
+    def __init__(self, name):
+        self._name = name
+        self._real = None
+
+    def log(self, *args, **kwargs):
+        if self._real is None:
+            from pysas.logger import TaskLogger
+            self._real = TaskLogger(self._name)
+        return self._real.log(*args, **kwargs)
+
+logger = _LazyLogger('startsas')
+
+def log_print(level, msg, before='', after=''):
+    """
+    Logs msg at level and prints it to the console, with optional text
+    (e.g. blank lines) before and after it on the console only.
+    """
+    logger.log(level, msg)
+    print(f'{before}{msg}{after}')
 
 def run(iparsdic):
     """
@@ -118,28 +142,20 @@ def run(iparsdic):
 
     logger.log('warning', f'Executing {__file__} {iparsdic}')
 
-    # Checking LHEASOFT, SAS_DIR and SAS_CCFPATH
-
-    lheasoft = os.environ.get('LHEASOFT')
-    if not lheasoft:
-        logger.log('error', 'LHEASOFT is not set. Please initialise HEASOFT')
-        raise Exception('LHEASOFT is not set. Please initialise HEASOFT')
-    else:
-        logger.log('info', f'LHEASOFT = {lheasoft}')
+    # Imported here, like the logger, so that importing startsas does not
+    # load the rest of pysas. SUM.SAS files are parsed in one place only.
+    from pysas.odfcontrol.odfcontrol import sum_sas_path
 
-    sasdir = os.environ.get('SAS_DIR')
-    if not sasdir:
-        logger.log('error', 'SAS_DIR is not defined. Please initialise SAS')
-        raise Exception('SAS_DIR is not defined. Please initialise SAS')
-    else:
-        logger.log('info', f'SAS_DIR = {sasdir}') 
+    # Checking LHEASOFT, SAS_DIR and SAS_CCFPATH
 
-    sasccfpath = os.environ.get('SAS_CCFPATH')
-    if not sasccfpath:
-        logger.log('error', 'SAS_CCFPATH not set. Please define it')
-        raise Exception('SAS_CCFPATH not set. Please define it')
-    else:
-        logger.log('info',f'SAS_CCFPATH = {sasccfpath}')
+    for variable, errmsg in (('LHEASOFT', 'LHEASOFT is not set. Please initialise HEASOFT'),
+                             ('SAS_DIR', 'SAS_DIR is not defined. Please initialise SAS'),
+                             ('SAS_CCFPATH', 'SAS_CCFPATH not set. Please define it')):
+        value = os.environ.get(variable)
+        if not value:
+            logger.log('error', errmsg)
+            raise Exception(errmsg)
+        logger.log('info', f'{variable} = {value}')
 
 
     # Where are we?
@@ -153,10 +169,8 @@ def run(iparsdic):
 
         # If workdir was not given as an absolute path, it is interpreted
         # as a subdirectory of startdir
-        if workdirectory[0] != '/':
-            workdirectory = os.path.join(startdir, workdirectory)
-        elif workdirectory[:2] == './':
-            workdirectory = os.path.join(startdir, workdirectory[2:])
+        if not os.path.isabs(workdirectory):
+            workdirectory = os.path.normpath(os.path.join(startdir, workdirectory))
 
         logger.log('info', f'Work directory = {workdirectory}')
 
@@ -192,8 +206,7 @@ def run(iparsdic):
             raise Exception('Parameter odfid icompatible with sas_ccf and sas_odf')
 
         odfid = iparsdic['odfid']
-        logger.log('info', 'Requesting odfid  = {} to XMM-Newton Science Archive\n'.format(iparsdic['odfid']))
-        print('Requesting odfid  = {} to XMM-Newton Science Archive\n'.format(iparsdic['odfid']))
+        log_print('info', 'Requesting odfid  = {} to XMM-Newton Science Archive\n'.format(iparsdic['odfid']))
 
         # Download the odfid from XMM-Newton, using astroquery
 
@@ -205,21 +218,17 @@ def run(iparsdic):
         tarfile = odfid + '.tar.gz'
 
         # Check that the tar.gz file has been downloaded
-        try:
-            os.path.exists(tarfile)
+        if os.path.exists(tarfile):
             logger.log('info', f'{tarfile} downloaded.') 
-        except FileExistsError:
-            logger.log('error', f'File {tarfile} is not present. Not downloaded?')
-            print(f'File {tarfile} is not present. Not downloaded?')
+        else:
+            log_print('error', f'File {tarfile} is not present. Not downloaded?')
             sys.exit(1)
 
         # Creates subdirectory odfid to move and unpack the odfid.tar.gz file
         if os.path.exists(os.path.join(workdirectory, odfid)):
-            logger.log('info', f'Removing existing directory {odfid} ...')
-            print(f'\n\nRemoving existing directory {odfid} ...')
+            log_print('info', f'Removing existing directory {odfid} ...', before='\n\n')
             shutil.rmtree(os.path.join(workdirectory, odfid))
-        logger.log('info', f'Creating directory {odfid} ...')
-        print(f'\nCreating directory {odfid} ...')
+        log_print('info', f'Creating directory {odfid} ...', before='\n')
         os.mkdir(odfid)
 
         # Moves odfid.tar.gz file to odfid
@@ -228,10 +237,13 @@ def run(iparsdic):
         # Changes dir to odfid
         os.chdir(odfid)
 
-        # Untars the odfid.tar.gz file
-        cmd = ['tar', 'zxf', tarfile]
-        logger.log('info', f'Unpacking {tarfile} ...')
-        print(f'\nUnpacking {tarfile} ...\n')
+        # Untars the odfid.tar.gz file. pigz, if installed, decompresses
+        # on several cores.
+        if shutil.which('pigz'):
+            cmd = ['tar', '--use-compress-program=pigz', '-xf', tarfile]
+        else:
+            cmd = ['tar', 'zxf', tarfile]
+        log_print('info', f'Unpacking {tarfile} ...', before='\n', after='\n')
         rc = subprocess.run(cmd)
         if rc.returncode != 0:
             logger.log('error', 'tar file extraction failed')
@@ -244,30 +256,35 @@ def run(iparsdic):
 
         # Obtains the name of the file with ext TAR
         TARFILE = glob.glob('*.TAR')
+        if not TARFILE:
+            logger.log('error', f'No TAR file found in {tarfile}')
+            raise Exception(f'No TAR file found in {tarfile}')
         cmd = ['tar', 'xf', TARFILE[0]]
         # Untars the TAR file
-        logger.log('info', f'Unpacking {TARFILE[0]} ...')
-        print(f'Unpacking {TARFILE[0]} ...')
+        log_print('info', f'Unpacking {TARFILE[0]} ...')
         rc = subprocess.run(cmd)
+        if rc.returncode != 0:
+            logger.log('error', 'tar file extraction failed')
+            raise Exception('tar file extraction failed')
+        else:
+            logger.log('info', f'{TARFILE[0]} extracted successfully!')
 
         os.remove(TARFILE[0])
         logger.log('info', f'{TARFILE[0]} removed')
 
         # Checks that the MANIFEST file is there
         MANIFEST = glob.glob('MANIFEST*')
-        try:
-            os.path.exists(MANIFEST[0])
+        if MANIFEST:
             logger.log('info', f'File {MANIFEST[0]} exists')
-        except FileExistsError:
-            logger.log('error', f'File {MANIFEST[0]} not present. Please check ODF!')
-            print(f'File {MANIFEST[0]} not present. Please check ODF!')
+        else:
+            log_print('error', 'MANIFEST file not present. Please check ODF!')
             sys.exit(1)
 
         # Here the ODF is fully untarred below odfid subdirectory
         # Now we start preparing the SAS_ODF and SAS_CCF
-        logger.log('info', f'Setting SAS_ODF = {os.getcwd()}')
-        print(f'\nSetting SAS_ODF = {os.getcwd()}')
-        os.environ['SAS_ODF'] = os.getcwd()
+        odf_dir = os.getcwd()
+        log_print('info', f'Setting SAS_ODF = {odf_dir}', before='\n')
+        os.environ['SAS_ODF'] = odf_dir
 
         # Change back workdirectory (we made it absolute if not so)
         os.chdir(workdirectory)
@@ -278,12 +295,10 @@ def run(iparsdic):
             cifbuild_opts_list = cifbuild_opts.split(" ") 
             cmd = ['cifbuild']
             cmd = cmd + cifbuild_opts_list
-            logger.log('info', f'Running cifbuild with {cifbuild_opts} ...')
-            print(f'\nRunning cifbuild with {cifbuild_opts} ...')
+            log_print('info', f'Running cifbuild with {cifbuild_opts} ...', before='\n')
         else:
             cmd = ['cifbuild']
-            logger.log('info', f'Running cifbuild...')
-            print(f'\nRunning cifbuild...')
+            log_print('info', f'Running cifbuild...', before='\n')
 
         rc = subprocess.run(cmd)
         if rc.returncode != 0:
@@ -292,18 +307,16 @@ def run(iparsdic):
 
         # Check whether ccf.cif is produced or not
         ccfcif = glob.glob('ccf.cif')
-        try:
-            os.path.exists(ccfcif[0])
+        if ccfcif:
             logger.log('info', f'CIF file {ccfcif[0]} created')
-        except FileExistsError:
+        else:
             logger.log('error','The ccf.cif was not produced')
             print('ccf.cif file is not produced')
             sys.exit(1)
 
         # Sets SAS_CCF variable
         fullccfcif = os.path.join(workdirectory, 'ccf.cif')
-        logger.log('info', f'Setting SAS_CCF = {fullccfcif}')
-        print(f'\nSetting SAS_CCF = {fullccfcif}')
+        log_print('info', f'Setting SAS_CCF = {fullccfcif}', before='\n')
         os.environ['SAS_CCF'] = fullccfcif
 
         # Now run odfingest
@@ -312,12 +325,10 @@ def run(iparsdic):
             odfingest_opts_list = odfingest_opts.split(" ")
             cmd = ['odfingest'] 
             cmd = cmd + odfingest_opts_list
-            logger.log('info', f'Running odfingest with {odfingest_opts} ...')
-            print(f'\nRunning odfingest with {odfiingest_opts} ...')
+            log_print('info', f'Running odfingest with {odfingest_opts} ...', before='\n')
         else:
             cmd = ['odfingest']
-            logger.log('info','Running odfingest...') 
-            print('\nRunning odfingest...')
+            log_print('info', 'Running odfingest...', before='\n')
 
         rc = subprocess.run(cmd)
         if rc.returncode != 0:
@@ -328,35 +339,29 @@ def run(iparsdic):
 
         # Check whether the SUM.SAS has been produced or not
         sumsas = glob.glob('*SUM.SAS')
-        try:
-            os.path.exists(sumsas[0])
+        if sumsas:
             logger.log('info', f'SAS summary file {sumsas[0]} created')
-        except FileExistsError:
-            logger.log('error','SUM.SAS file was not produced') 
-            print('SUM.SAS file was not produced')
+        else:
+            log_print('error', 'SUM.SAS file was not produced')
             sys.exit(1)
 
         # Set the SAS_ODF to the SUM.SAS file
         fullsumsas = os.path.join(workdirectory, sumsas[0])
         os.environ['SAS_ODF'] = fullsumsas
-        logger.log('info', f'Setting SAS_ODF = {fullsumsas}')
-        print(f'\nSetting SAS_ODF = {fullsumsas}')
+        log_print('info', f'Setting SAS_ODF = {fullsumsas}', before='\n')
 
         # sasodf is the dirname of fullsumsas + odfid. It will be used below.
         sasodf = os.path.join(os.path.dirname(fullsumsas), odfid)
 
         # Check that the SUM.SAS file has the right PATH keyword
-        with open(fullsumsas) as inf:
-            lines = inf.readlines()
-        for line in lines:
-            if 'PATH' in line:
-                key, path = line.split()
-                if path != sasodf:
-                    logger.log('error', f'SAS summary file PATH mismatchs {sasodf}')
-                    raise Exception(f'SAS summary file PATH mismatchs {sasodf}')
-                else:
-                    logger.log('info', f'Summary file PATH keyword matches {sasodf}')
-                    print(f'\nWarning: Summary file PATH keyword matches {sasodf}')
+        path = sum_sas_path(fullsumsas)
+        if path is not None:
+            if path != sasodf:
+                logger.log('error', f'SAS summary file PATH mismatchs {sasodf}')
+                raise Exception(f'SAS summary file PATH mismatchs {sasodf}')
+            else:
+                logger.log('info', f'Summary file PATH keyword matches {sasodf}')
+                print(f'\nWarning: Summary file PATH keyword matches {sasodf}')
 
         print(f'''\n\n
         SAS_CCF = {fullccfcif}
@@ -371,8 +376,7 @@ def run(iparsdic):
             raise Exception('Parameter odfid icompatible with sas_ccf and sas_odf')
 
         odfid = iparsdic['odfid']
-        logger.log('info', 'Requesting odfid  = {} to XMM-Newton Science Archive\n'.format(iparsdic['odfid']))
-        print('Requesting odfid  = {} to XMM-Newton Science Archive\n'.format(iparsdic['odfid']))
+        log_print('info', 'Requesting odfid  = {} to XMM-Newton Science Archive\n'.format(iparsdic['odfid']))
 
         # Download the odfid from XMM-Newton, using astroquery
 
@@ -384,12 +388,10 @@ def run(iparsdic):
         tarfile = odfid + '.tar'
 
         # Check that the tar file has been downloaded
-        try:
-            os.path.exists(tarfile)
+        if os.path.exists(tarfile):
             logger.log('info', f'Tarfile {tarfile} downloaded')
-        except FileExistsError:
-            logger.log('error', f'File {tarfile} is not present. Not downloaded?')
-            print(f'File {tarfile} is not present. Not downloaded?')
+        else:
+            log_print('error', f'File {tarfile} is not present. Not downloaded?')
             sys.exit(1)
 
         # If does not exist, it creates subdirectory odfid 
@@ -407,8 +409,7 @@ def run(iparsdic):
 
         # Untars the odfid.tar.gz file
         cmd = ['tar', 'xf', tarfile]
-        logger.log('info', f'Unpacking {tarfile} ...')
-        print(f'\nUnpacking {tarfile} ...\n')
+        log_print('info', f'Unpacking {tarfile} ...', before='\n', after='\n')
         rc = subprocess.run(cmd)
         if rc.returncode != 0:
             logger.log('error', 'tar file extraction failed')
@@ -441,44 +442,35 @@ def run(iparsdic):
         if sasodf[0] != '/':
             raise Exception(f'{sasodf} must be defined with absolute path')
 
-        try:
-            os.path.exists(sasccf)
+        if os.path.exists(sasccf):
             logger.log('info', f'{sasccf} is present')
-        except FileExistsError:
-            logger.log('error', f'File {sasccf} not found.')
-            print(f'File {sasccf} not found.')
+        else:
+            log_print('error', f'File {sasccf} not found.')
             sys.exit(1)
 
-        try:
-            os.path.exists(sasodf)
+        if os.path.exists(sasodf):
             logger.log('info', f'{sasodf} is present')
-        except FileExistsError:
-            logger.log('error', f'File {sasodf} not found.')
-            print(f'File {sasodf} not found.')
+        else:
+            log_print('error', f'File {sasodf} not found.')
             sys.exit(1)
 
         os.environ['SAS_CCF'] = sasccf
-        logger.log('info', f'SAS_CCF = {sasccf}')
-        print(f'SAS_CCF = {sasccf}')
+        log_print('info', f'SAS_CCF = {sasccf}')
 
         if 'SUM.SAS' not in iparsdic['sas_odf']:
             logger.log('error', '{} does not refer to a SAS SUM file'.format(iparsdic['sas_odf']))
             raise Exception('{} does not refer to a SAS SUM file'.format(iparsdic['sas_odf']))
 
         # Check that the SUM.SAS file PATH keyword points to a real ODF directory
-        with open(sasodf) as inf:
-            lines = inf.readlines()
-        for line in lines:
-            if 'PATH' in line:
-                key, path = line.split()
-                if not os.path.exists(path):
-                    logger.log('error', f'Summary file PATH {path} does not exist.')
-                    raise Exception(f'Summary file PATH {path} does not exist.')
-                MANIFEST = glob.glob(os.path.join(path, 'MANIFEST*'))
-                if not os.path.exists(MANIFEST[0]):
-                    logger.log('error', f'Missing {MANIFEST[0]} file in {path}. Missing ODF components?')
-                    raise Exception(f'\nMissing {MANIFEST[0]} file in {path}. Missing ODF components?')
+        path = sum_sas_path(sasodf)
+        if path is not None:
+            if not os.path.exists(path):
+                logger.log('error', f'Summary file PATH {path} does not exist.')
+                raise Exception(f'Summary file PATH {path} does not exist.')
+            MANIFEST = glob.glob(os.path.join(path, 'MANIFEST*'))
+            if not MANIFEST:
+                logger.log('error', f'Missing MANIFEST file in {path}. Missing ODF components?')
+                raise Exception(f'\nMissing MANIFEST file in {path}. Missing ODF components?')
 
         os.environ['SAS_ODF'] = sasodf
-        logger.log('info', f'SAS_ODF = {sasodf}')
-        print(f'SAS_ODF = {sasodf}')
\ No newline at end of file
+        log_print('info', f'SAS_ODF = {sasodf}')
\ No newline at end of file